@@ -1,26 +1,29 @@
 import logging
 
-import bcrypt
 import streamlit as st
 import streamlit_authenticator as stauth
 from captcha.image import ImageCaptcha
 
 from functions.authenticator import (
-    get_users_from_db,
+    get_user_credentials,
     password_reset_screen,
     render_forgot_password_form,
     render_registration_form,
+    session_credentials,
 )
 from functions.captcha import (
     generate_captcha_image,
-    generate_captcha_text,
+    new_captcha,
     validate_captcha,
 )
-from lib.db import init_db
+from lib.db import init_db, track_render, unit_of_work
+from lib.hashing import verify_password
 from lib.helpers import (
-    get_user_by_username_or_email,
+    get_user_id_by_username,
+    upgrade_password_hash,
 )
-from pages import dashboard, billers, bills, payments
+from lib.throttle import throttle
+from pages import dashboard, billers, bills, payments, imports
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -50,121 +53,149 @@ def main():
     try:
         setup_application()
 
-        if "reset_token" in st.query_params:
-            password_reset_screen(
-                token=st.query_params["reset_token"],
-                st=st,
-                logger=logger,
-            )
-            return
-
-        credentials = get_users_from_db()
-        authenticator = stauth.Authenticate(
-            credentials=credentials,
-            cookie_name="expense_tracker_cookie",
-            api_key=st.secrets["auth_secret_key"],
-            cookie_expiry_days=30,
-        )
-
-        # Render main app if user is already logged in
-        if st.session_state.get("authentication_status"):
-            with st.sidebar:
-                st.write(f'Welcome *{st.session_state["name"]}*')
-                try:
-                    authenticator.logout("Logout", "main")
-                except Exception as e:
-                    logger.error(f"Error during logout: {e}")
-                    st.error("An error occurred during logout.")
-                st.divider()
-                st.title("Navigation")
-                page_choice = st.radio(
-                    "Go to",
-                    ["Dashboard", "Billers", "Bills", "Payments"],
-                    label_visibility="collapsed",
+        # One session (and one pooled connection) for the whole rerun
+        with unit_of_work():
+            if "reset_token" in st.query_params:
+                password_reset_screen(
+                    token=st.query_params["reset_token"],
+                    st=st,
+                    logger=logger,
                 )
+                return
+
+            credentials = session_credentials(st.session_state)
+            authenticator = stauth.Authenticate(
+                credentials=credentials,
+                cookie_name="expense_tracker_cookie",
+                api_key=st.secrets["auth_secret_key"],
+                cookie_expiry_days=30,
+            )
 
-            user = get_user_by_username_or_email(st.session_state["username"])
-            user_id = user.id
-
-            try:
-                if page_choice == "Dashboard":
-                    dashboard.show(user_id)
-                elif page_choice == "Billers":
-                    billers.show(user_id)
-                elif page_choice == "Bills":
-                    bills.show(user_id)
-                elif page_choice == "Payments":
-                    payments.show(user_id)
-                else:
-                    st.write("Page not found")
-            except Exception as e:
-                logger.error(f"Error rendering page {page_choice}: {e}")
-                st.error("An unexpected error occurred on this page.")
-            return
-
-        # --- Authentication Forms ---
-        choice = st.radio(
-            "Authentication",
-            [
-                "Login",
-                "Register",
-                "Forgot Password",
-            ],
-            horizontal=True,
-        )
-
-        if choice == "Login":
-            st.subheader("Login")
-
-            if "captcha_text" not in st.session_state:
-                st.session_state["captcha_text"] = generate_captcha_text()
-
-            if st.button("Refresh Captcha", key="login_refresh"):
-                st.session_state["captcha_text"] = generate_captcha_text()
-
-            with st.form("login_form"):
-                username = st.text_input("Username")
-                password = st.text_input("Password", type="password")
+            # Render main app if user is already logged in
+            if st.session_state.get("authentication_status"):
+                with st.sidebar:
+                    st.write(f'Welcome *{st.session_state["name"]}*')
+                    try:
+                        authenticator.logout("Logout", "main")
+                        if not st.session_state.get("authentication_status"):
+                            st.session_state.pop("user_id", None)
+                            st.session_state.pop("credentials", None)
+                            st.rerun()
+                    except Exception as e:
+                        logger.error(f"Error during logout: {e}")
+                        st.error("An error occurred during logout.")
+                    st.divider()
+                    st.title("Navigation")
+                    page_choice = st.radio(
+                        "Go to",
+                        ["Dashboard", "Billers", "Bills", "Payments", "Import"],
+                        label_visibility="collapsed",
+                    )
 
-                col1, col2 = st.columns([0.4, 0.6])
-                with col1:
-                    st.image(
-                        generate_captcha_image(st, image), use_container_width=True
+                # Resolved once per login; later reruns read it from session state
+                if st.session_state.get("user_id") is None:
+                    st.session_state["user_id"] = get_user_id_by_username(
+                        st.session_state["username"]
                     )
-                captcha_input = st.text_input("Enter the text from the image")
-
-                submitted = st.form_submit_button("Login")
-
-                if submitted:
-                    if not all([username, password, captcha_input]):
-                        st.error("Please fill out all fields.")
-                    elif not validate_captcha(captcha_input, st):
-                        st.error("Captcha is incorrect.")
-                        st.session_state["captcha_text"] = generate_captcha_text()
-                    else:
-                        user_data = credentials.get("usernames", {}).get(username)
-                        if user_data and bcrypt.checkpw(
-                            password.encode(), user_data["password"].encode()
-                        ):
-                            st.session_state["authentication_status"] = True
-                            st.session_state["name"] = user_data["name"]
-                            st.session_state["username"] = username
-                            st.rerun()
-                        else:
-                            st.error("Username/password is incorrect")
+                user_id = st.session_state["user_id"]
 
-        elif choice == "Register":
-            render_registration_form(
-                st=st,
-                image=image,
-                logger=logger,
-            )
-        elif choice == "Forgot Password":
-            render_forgot_password_form(
-                st=st,
-                image=image,
-                logger=logger,
+                try:
+                    with track_render(f"{page_choice.lower()}.show") as render:
+                        if page_choice == "Dashboard":
+                            dashboard.show(user_id)
+                        elif page_choice == "Billers":
+                            billers.show(user_id)
+                        elif page_choice == "Bills":
+                            bills.show(user_id)
+                        elif page_choice == "Payments":
+                            payments.show(user_id)
+                        elif page_choice == "Import":
+                            imports.show(user_id)
+                        else:
+                            st.write("Page not found")
+                    logger.info(f"Rendered {render.name}: {render.summary()}")
+                except Exception as e:
+                    logger.error(f"Error rendering page {page_choice}: {e}")
+                    st.error("An unexpected error occurred on this page.")
+                return
+
+            # --- Authentication Forms ---
+            choice = st.radio(
+                "Authentication",
+                [
+                    "Login",
+                    "Register",
+                    "Forgot Password",
+                ],
+                horizontal=True,
             )
+
+            if choice == "Login":
+                st.subheader("Login")
+
+                if "captcha_text" not in st.session_state:
+                    new_captcha(st, image)
+
+                if st.button("Refresh Captcha", key="login_refresh"):
+                    new_captcha(st, image)
+
+                with st.form("login_form"):
+                    username = st.text_input("Username")
+                    password = st.text_input("Password", type="password")
+
+                    col1, col2 = st.columns([0.4, 0.6])
+                    with col1:
+                        st.image(
+                            generate_captcha_image(st, image), use_container_width=True
+                        )
+                    captcha_input = st.text_input("Enter the text from the image")
+
+                    submitted = st.form_submit_button("Login")
+
+                    if submitted:
+                        client = st.context.ip_address
+                        if not all([username, password, captcha_input]):
+                            st.error("Please fill out all fields.")
+                        elif not validate_captcha(captcha_input, st):
+                            st.error("Captcha is incorrect.")
+                            new_captcha(st, image)
+                        elif not throttle.allow(username, client):
+                            # Rejected before any bcrypt work is done
+                            throttle.recorder.record(username, False)
+                            st.error("Too many login attempts. Please try again later.")
+                        else:
+                            user_data = get_user_credentials(username)
+                            authenticated = bool(user_data) and verify_password(
+                                password, user_data["password"]
+                            )
+                            throttle.record(username, authenticated, client)
+                            if authenticated:
+                                upgrade_password_hash(
+                                    user_data["id"], password, user_data["password"]
+                                )
+                                st.session_state["authentication_status"] = True
+                                st.session_state["name"] = user_data["name"]
+                                st.session_state["username"] = username
+                                st.session_state["user_id"] = user_data["id"]
+                                st.session_state["credentials"] = {
+                                    "usernames": {username: user_data}
+                                }
+                                st.rerun()
+                            else:
+                                st.error("Username/password is incorrect")
+
+            elif choice == "Register":
+                render_registration_form(
+                    st=st,
+                    image=image,
+                    logger=logger,
+                )
+            elif choice == "Forgot Password":
+                render_forgot_password_form(
+                    st=st,
+                    image=image,
+                    logger=logger,
+                )
     except Exception as e:
         logger.critical(
             f"An unexpected error occurred in the main application: {e}", exc_info=True
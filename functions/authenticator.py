@@ -1,5 +1,5 @@
 from functions.captcha import (
-    generate_captcha_text,
+    new_captcha,
     generate_captcha_image,
     validate_captcha,
 )
@@ -16,24 +16,66 @@ from lib.models import UserAuth, UserProfile
 # --- Streamlit Authenticator ---
 
 
-def get_users_from_db():
+def get_user_credentials(username):
+    """Look up the login credentials of a single user by username."""
+    if not username:
+        return None
     with provide_session() as db:
-        users = db.query(UserAuth).join(UserProfile).all()
-        credentials = {"usernames": {}}
-        for user in users:
-            credentials["usernames"][user.username] = {
-                "name": user.profile.full_name,
-                "password": user.password_hash,
-                "email": user.profile.email,
-            }
-        return credentials
+        row = (
+            db.query(
+                UserAuth.id,
+                UserAuth.password_hash,
+                UserProfile.full_name,
+                UserProfile.email,
+            )
+            .join(UserProfile)
+            .filter(UserAuth.username == username)
+            .first()
+        )
+        if not row:
+            return None
+        return {
+            "id": row.id,
+            "name": row.full_name,
+            "password": row.password_hash,
+            "email": row.email,
+        }
+
+
+def get_credentials_for(username=None):
+    """
+    Build the streamlit_authenticator credentials dict for one user.
+
+    Only the user that is logging in (or already logged in) is loaded, so
+    the cost stays constant no matter how many accounts exist.
+    """
+    credentials = {"usernames": {}}
+    user_data = get_user_credentials(username)
+    if user_data:
+        credentials["usernames"][username] = user_data
+    return credentials
+
+
+def session_credentials(session_state):
+    """
+    The credentials dict for the current session, loaded once per login.
+
+    The login form stores them in session state and logout clears them,
+    so authenticated reruns reuse them instead of querying the user again.
+    """
+    credentials = session_state.get("credentials")
+    if credentials is None:
+        credentials = get_credentials_for(session_state.get("username"))
+        if session_state.get("authentication_status"):
+            session_state["credentials"] = credentials
+    return credentials
 
 
 def render_registration_form(st, image, logger):
     st.subheader("Register")
 
     if st.button("Refresh Captcha", key="register_refresh"):
-        st.session_state["captcha_text"] = generate_captcha_text()
+        new_captcha(st, image)
 
     with st.form("register_form"):
         name = st.text_input("Full Name")
@@ -76,7 +118,7 @@ def render_forgot_password_form(st, image, logger):
     st.subheader("Forgot Password")
 
     if st.button("Refresh Captcha", key="forgot_password_refresh"):
-        st.session_state["captcha_text"] = generate_captcha_text()
+        new_captcha(st, image)
 
     with st.form("forgot_password_form"):
         identifier = st.text_input("Enter your username or email")
@@ -1,5 +1,11 @@
+import os
+import queue
 import random
 import string
+import threading
+
+# Number of pre-rendered (text, PNG bytes) challenges kept ready
+CAPTCHA_POOL_SIZE = int(os.getenv("CAPTCHA_POOL_SIZE", "32"))
 
 # --- Captcha ---
 
@@ -8,12 +14,73 @@ def generate_captcha_text(length=6):
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=length))
 
 
+class CaptchaPool:
+    """
+    Bounded pool of pre-rendered captcha challenges.
+
+    A daemon thread keeps the pool topped up, so handing out a challenge
+    never renders an image on the Streamlit script thread unless the pool
+    has run dry.
+    """
+
+    def __init__(self, image, size=CAPTCHA_POOL_SIZE, length=6):
+        self.image = image
+        self.length = length
+        self._pool = queue.Queue(maxsize=size)
+        self._render_lock = threading.Lock()
+        self._filler = threading.Thread(
+            target=self._fill, name="captcha-pool", daemon=True
+        )
+        self._filler.start()
+
+    def take(self):
+        """Return a (text, PNG bytes) pair."""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self.render(generate_captcha_text(self.length))
+
+    def render(self, text):
+        with self._render_lock:
+            return text, self.image.generate(text).getvalue()
+
+    def _fill(self):
+        while True:
+            # Blocks while the pool is full
+            self._pool.put(self.render(generate_captcha_text(self.length)))
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_captcha_pool(image):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CaptchaPool(image)
+        return _pool
+
+
+def new_captcha(st, image):
+    """Start a new challenge from the pre-rendered pool."""
+    text, png = get_captcha_pool(image).take()
+    st.session_state["captcha_text"] = text
+    st.session_state["captcha_image"] = (text, png)
+
+
 def generate_captcha_image(st, image):
     if "captcha_text" not in st.session_state:
-        st.session_state["captcha_text"] = generate_captcha_text()
+        new_captcha(st, image)
 
-    captcha_image = image.generate(st.session_state["captcha_text"])
-    return captcha_image
+    # Serve the bytes rendered for this challenge; render only if the text
+    # was set without an image (once per challenge, not once per rerun)
+    text = st.session_state["captcha_text"]
+    cached = st.session_state.get("captcha_image")
+    if cached is None or cached[0] != text:
+        cached = get_captcha_pool(image).render(text)
+        st.session_state["captcha_image"] = cached
+    return cached[1]
 
 
 def validate_captcha(user_input, st):
@@ -0,0 +1,225 @@
+import argparse
+import logging
+import sys
+
+from sqlalchemy import (
+    Integer,
+    case,
+    cast,
+    delete,
+    extract,
+    func,
+    insert,
+    select,
+    update,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from lib.cache import invalidate_all_users, invalidate_user
+from lib.db import init_db, provide_session
+from lib.models import Bill, MonthlyTotal, Payment
+from lib.money import sql_cents, to_cents
+
+logger = logging.getLogger(__name__)
+
+TOTAL_COLUMNS = ("billed", "paid", "outstanding")
+KEY_COLUMNS = ("user_id", "biller_id", "year", "month")
+
+
+def monthly_key(biller_id, due_date):
+    """The monthly_totals bucket a bill falls into, without the user id."""
+    return (biller_id, due_date.year, due_date.month)
+
+
+def bill_totals(amount, balance_amount, status, paid=0):
+    """(billed, paid, outstanding) cents that one bill adds to its month."""
+    outstanding = 0
+    if status != "paid":
+        outstanding = to_cents(amount if balance_amount is None else balance_amount)
+    return (to_cents(amount), paid, outstanding)
+
+
+class MonthlyDeltas(dict):
+    """Changes to apply to monthly_totals, keyed by monthly_key()."""
+
+    def add(self, key, totals, sign=1):
+        current = self.get(key, (0, 0, 0))
+        self[key] = tuple(c + sign * t for c, t in zip(current, totals))
+
+    def subtract(self, key, totals):
+        self.add(key, totals, sign=-1)
+
+
+def apply_monthly_deltas(db, user_id, deltas):
+    """
+    Add the deltas to monthly_totals inside the caller's transaction.
+
+    Rows are upserted with "total = total + delta", so concurrent writers
+    to the same month never overwrite each other's changes.
+    """
+    rows = [
+        {
+            "user_id": user_id,
+            "biller_id": biller_id,
+            "year": year,
+            "month": month,
+            **dict(zip(TOTAL_COLUMNS, totals)),
+        }
+        for (biller_id, year, month), totals in deltas.items()
+        if any(totals)
+    ]
+    if not rows:
+        return
+
+    table = MonthlyTotal.__table__
+    dialect = {"sqlite": sqlite, "postgresql": postgresql}.get(
+        db.get_bind().dialect.name
+    )
+    if dialect is not None:
+        stmt = dialect.insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[name] for name in KEY_COLUMNS],
+            set_={name: table.c[name] + stmt.excluded[name] for name in TOTAL_COLUMNS},
+        )
+        db.execute(stmt, rows)
+        return
+
+    for row in rows:
+        updated = db.execute(
+            update(table)
+            .where(*(table.c[name] == row[name] for name in KEY_COLUMNS))
+            .values({name: table.c[name] + row[name] for name in TOTAL_COLUMNS})
+        ).rowcount
+        if not updated:
+            db.execute(insert(table), row)
+
+
+def _expected_totals(user_id=None):
+    """Select the monthly totals as computed from bills and payments."""
+    paid = select(
+        Payment.bill_id, func.sum(sql_cents(Payment.amount)).label("paid")
+    ).group_by(Payment.bill_id)
+    if user_id is not None:
+        paid = paid.where(Payment.user_id == user_id)
+    paid = paid.subquery()
+
+    year = cast(extract("year", Bill.due_date), Integer)
+    month = cast(extract("month", Bill.due_date), Integer)
+    outstanding = sql_cents(func.coalesce(Bill.balance_amount, Bill.amount))
+    query = (
+        select(
+            Bill.user_id,
+            Bill.biller_id,
+            year,
+            month,
+            func.sum(sql_cents(Bill.amount)),
+            func.coalesce(func.sum(paid.c.paid), 0),
+            func.sum(case((Bill.status != "paid", outstanding), else_=0)),
+        )
+        .outerjoin(paid, paid.c.bill_id == Bill.id)
+        .group_by(Bill.user_id, Bill.biller_id, year, month)
+    )
+    if user_id is not None:
+        query = query.where(Bill.user_id == user_id)
+    return query
+
+
+def rebuild_monthly_totals(user_id=None):
+    """
+    Recompute monthly_totals from scratch, for one user or everyone.
+
+    Needed once for databases that had bills before the table existed, or
+    after check_monthly_totals() reports drift. Returns the row count.
+    """
+    with provide_session() as db:
+        stmt = delete(MonthlyTotal)
+        if user_id is not None:
+            stmt = stmt.where(MonthlyTotal.user_id == user_id)
+        db.execute(stmt)
+        db.execute(
+            insert(MonthlyTotal).from_select(
+                [*KEY_COLUMNS, *TOTAL_COLUMNS], _expected_totals(user_id)
+            )
+        )
+        count = db.query(func.count()).select_from(MonthlyTotal)
+        if user_id is not None:
+            count = count.filter(MonthlyTotal.user_id == user_id)
+        count = count.scalar()
+        if user_id is None:
+            invalidate_all_users(db)
+        else:
+            invalidate_user(db, user_id)
+        db.commit()
+
+    logger.info("Rebuilt %d monthly totals", count)
+    return count
+
+
+def ensure_monthly_totals():
+    """
+    Fill monthly_totals on databases that had bills before the table existed.
+
+    create_all() adds the table empty; the write helpers only apply deltas
+    to it, so without a rebuild the chart would show nothing, or negative
+    totals once old bills change. Returns the rebuilt row count, or None
+    when the table was already in use.
+    """
+    with provide_session() as db:
+        has_totals = db.query(select(MonthlyTotal.user_id).exists()).scalar()
+        has_bills = db.query(select(Bill.id).exists()).scalar()
+    if has_totals or not has_bills:
+        return None
+    return rebuild_monthly_totals()
+
+
+def check_monthly_totals(user_id=None):
+    """
+    Compare monthly_totals with the bills and payments they summarize.
+
+    Returns a list of (key, stored, expected) tuples, one per month that
+    disagrees; key is (user_id, biller_id, year, month) and the totals are
+    (billed, paid, outstanding) cents. Missing rows count as all zeros.
+    """
+    with provide_session() as db:
+        expected = {
+            tuple(row[:4]): tuple(row[4:])
+            for row in db.execute(_expected_totals(user_id))
+        }
+        stored_query = db.query(
+            *(getattr(MonthlyTotal, name) for name in KEY_COLUMNS + TOTAL_COLUMNS)
+        )
+        if user_id is not None:
+            stored_query = stored_query.filter(MonthlyTotal.user_id == user_id)
+        stored = {tuple(row[:4]): tuple(row[4:]) for row in stored_query}
+
+    zeros = (0, 0, 0)
+    return [
+        (key, stored.get(key, zeros), expected.get(key, zeros))
+        for key in sorted(expected.keys() | stored.keys())
+        if stored.get(key, zeros) != expected.get(key, zeros)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m lib.aggregates",
+        description="Rebuild or verify the monthly_totals table.",
+    )
+    parser.add_argument("command", choices=["rebuild", "check"])
+    parser.add_argument("--user-id", type=int, help="only this user's totals")
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.command == "rebuild":
+        print(f"Rebuilt {rebuild_monthly_totals(args.user_id)} monthly totals")
+        return 0
+
+    mismatches = check_monthly_totals(args.user_id)
+    for key, stored, expected in mismatches:
+        print(f"{key}: stored {stored}, expected {expected}")
+    print(f"{len(mismatches)} mismatched monthly totals")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,211 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from lib.db import outside_unit_of_work, provide_session
+from lib.models import UserAuth, UserDataVersion
+
+# Upper bounds for the per-user result cache. Entries are weighted by the
+# number of rows they hold, so a few huge lists cannot crowd out memory.
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "1024"))
+USER_CACHE_MAX_ROWS = int(os.getenv("USER_CACHE_MAX_ROWS", "50000"))
+# Seconds a process trusts the data version it last saw before reading it
+# from the database again, to notice writes made by other processes
+USER_CACHE_VERSION_TTL = float(os.getenv("USER_CACHE_VERSION_TTL", "2"))
+
+
+class UserDataCache:
+    """
+    LRU cache of read-helper results keyed by (user_id, data_version, call).
+
+    The data version is kept in the user_data_versions table and write
+    helpers bump it in their transaction (see invalidate_user()). observe()
+    records the versions this process sees; entries for older versions are
+    never served again and are dropped right away. A version is trusted
+    for `version_ttl` seconds before it is read again, so writes made by
+    other processes show up within that time. The entries live in process
+    memory, shared by every Streamlit session served by this process.
+    """
+
+    def __init__(
+        self,
+        max_entries=USER_CACHE_MAX_ENTRIES,
+        max_rows=USER_CACHE_MAX_ROWS,
+        version_ttl=USER_CACHE_VERSION_TTL,
+        clock=time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.version_ttl = version_ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._versions = {}  # user_id -> (version, time it was seen)
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def version(self, user_id):
+        with self._lock:
+            return self._versions.get(user_id, (0, None))[0]
+
+    def is_current(self, user_id):
+        """Whether the user's version was seen within the last version_ttl."""
+        with self._lock:
+            _, seen_at = self._versions.get(user_id, (0, None))
+            return seen_at is not None and self._clock() - seen_at < self.version_ttl
+
+    def observe(self, user_id, version):
+        """Record a version read from or written to the database."""
+        with self._lock:
+            current, _ = self._versions.get(user_id, (0, None))
+            if version > current:
+                for key in [k for k in self._entries if k[0] == user_id]:
+                    self._remove(key)
+            self._versions[user_id] = (max(version, current), self._clock())
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return None, False
+            self._entries.move_to_end(key)
+            return self._entries[key][0], True
+
+    def set(self, key, value):
+        weight = len(value) if isinstance(value, list) else 1
+        with self._lock:
+            user_id, version = key[0], key[1]
+            current, _ = self._versions.get(user_id, (0, None))
+            if version != current or weight > self.max_rows:
+                # A write landed while loading, or the result is too large
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, weight)
+            self._rows += weight
+            while len(self._entries) > self.max_entries or self._rows > self.max_rows:
+                self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._versions.clear()
+            self._rows = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        _, weight = self._entries.pop(key)
+        self._rows -= weight
+
+
+user_cache = UserDataCache()
+
+
+def cached_per_user(func):
+    """
+    Cache a read helper whose first argument is the user id.
+
+    Results (named tuples, see lib.rows) are loaded outside any
+    rerun-scoped session, so they are snapshots unaffected by later
+    commits or rollbacks of the rerun that happened to load them. Anything
+    else the result depends on, such as today's date, must be an argument
+    so that it is part of the key.
+    """
+
+    @functools.wraps(func)
+    def wrapper(user_id, *args, **kwargs):
+        version = data_version(user_id)
+        key = (user_id, version, func.__name__, args, tuple(sorted(kwargs.items())))
+        value, hit = user_cache.get(key)
+        if hit:
+            return value
+        with outside_unit_of_work():
+            value = func(user_id, *args, **kwargs)
+        user_cache.set(key, value)
+        return value
+
+    return wrapper
+
+
+def data_version(user_id):
+    """The user's data version, read from the database once per version_ttl."""
+    if not user_cache.is_current(user_id):
+        with outside_unit_of_work(), provide_session() as db:
+            version = db.scalar(
+                select(UserDataVersion.version).where(
+                    UserDataVersion.user_id == user_id
+                )
+            )
+        user_cache.observe(user_id, version or 0)
+    return user_cache.version(user_id)
+
+
+def _bump_version(db, user_id):
+    """Increment the user's data version in the caller's transaction."""
+    table = UserDataVersion.__table__
+    bind_dialect = db.get_bind().dialect
+    dialect = {"sqlite": sqlite, "postgresql": postgresql}.get(bind_dialect.name)
+    if dialect is not None:
+        stmt = dialect.insert(table).values(user_id=user_id, version=1)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id],
+            set_={"version": table.c.version + 1},
+        )
+        if bind_dialect.insert_returning:
+            return db.scalar(stmt.returning(table.c.version))
+        db.execute(stmt)
+    else:
+        updated = db.execute(
+            update(table)
+            .where(table.c.user_id == user_id)
+            .values(version=table.c.version + 1)
+        ).rowcount
+        if not updated:
+            db.execute(insert(table).values(user_id=user_id, version=1))
+    return db.scalar(select(table.c.version).where(table.c.user_id == user_id))
+
+
+def invalidate_user(db, user_id):
+    """
+    Move a user to a new data version, inside the write's transaction.
+
+    Call it right before db.commit(): the new version commits together
+    with the data, and once it has, this process drops the user's cached
+    results (see _observe_committed_versions).
+    """
+    db.info.setdefault("data_versions", {})[user_id] = _bump_version(db, user_id)
+
+
+def invalidate_all_users(db):
+    """Move every user to a new data version, e.g. before committing a rebuild."""
+    table = UserDataVersion.__table__
+    db.execute(update(table).values(version=table.c.version + 1))
+    db.execute(
+        insert(table).from_select(
+            ["user_id", "version"],
+            select(UserAuth.id, literal(1)).where(
+                UserAuth.id.not_in(select(table.c.user_id))
+            ),
+        )
+    )
+    db.info["data_versions_all"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _observe_committed_versions(session):
+    if session.info.pop("data_versions_all", False):
+        user_cache.clear()
+    for user_id, version in session.info.pop("data_versions", {}).items():
+        user_cache.observe(user_id, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_versions(session):
+    session.info.pop("data_versions_all", None)
+    session.info.pop("data_versions", None)
@@ -1,18 +1,94 @@
+import json
+import logging
 import os
+import threading
+import time
 from contextlib import contextmanager
+from contextvars import ContextVar
 
 import streamlit as st
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.schema import CreateIndex
+
+logger = logging.getLogger(__name__)
 
 # Use environment variable for DB URL, default to local SQLite
 # This allows easy switching to PostgreSQL/MySQL in production
 DEFAULT_DB_PATH = os.path.join("data", "expense_tracker.db")
 DB_URL = os.getenv("DATABASE_URL", f"sqlite:///{DEFAULT_DB_PATH}")
 
+# SQLite connection tuning, applied to every new DBAPI connection.
+# "tuned" lets readers proceed while a writer commits (WAL) and makes writers
+# wait for the lock instead of failing with "database is locked".
+# "default" leaves SQLite's built-in settings untouched.
+SQLITE_PRAGMA_PROFILE = os.getenv("SQLITE_PRAGMA_PROFILE", "tuned")
+SQLITE_PRAGMA_PROFILES = {
+    "default": {},
+    "tuned": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,  # ms
+        "mmap_size": 256 * 1024 * 1024,  # bytes
+        "cache_size": -64 * 1024,  # negative means KiB, i.e. 64 MiB
+        "temp_store": "MEMORY",
+    },
+}
+# Individual overrides on top of the selected profile
+SQLITE_PRAGMA_ENV = {
+    "journal_mode": "SQLITE_JOURNAL_MODE",
+    "synchronous": "SQLITE_SYNCHRONOUS",
+    "busy_timeout": "SQLITE_BUSY_TIMEOUT_MS",
+    "mmap_size": "SQLITE_MMAP_SIZE",
+    "cache_size": "SQLITE_CACHE_SIZE",
+    "temp_store": "SQLITE_TEMP_STORE",
+}
+
+# Queries slower than this are written to the slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+
+# Indexes that older versions created but no query uses; ensure_indexes()
+# drops them so they stop adding write cost
+OBSOLETE_INDEXES = ("ix_bills_user_id_unpaid_due_date",)
+
 Base = declarative_base()
 
 
+def get_sqlite_pragmas():
+    """Resolve the configured pragma profile plus any per-pragma overrides."""
+    if SQLITE_PRAGMA_PROFILE not in SQLITE_PRAGMA_PROFILES:
+        raise ValueError(
+            f"Unknown SQLITE_PRAGMA_PROFILE '{SQLITE_PRAGMA_PROFILE}', "
+            f"expected one of {sorted(SQLITE_PRAGMA_PROFILES)}"
+        )
+    pragmas = dict(SQLITE_PRAGMA_PROFILES[SQLITE_PRAGMA_PROFILE])
+    for pragma, env_var in SQLITE_PRAGMA_ENV.items():
+        value = os.getenv(env_var)
+        if value:
+            pragmas[pragma] = value
+    return pragmas
+
+
+def _install_sqlite_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma, value in pragmas.items():
+                cursor.execute(f"PRAGMA {pragma}={value}")
+        finally:
+            cursor.close()
+
+
+def read_sqlite_pragmas(engine):
+    """Return the pragma values actually in effect on a pooled connection."""
+    with engine.connect() as conn:
+        return {
+            pragma: conn.exec_driver_sql(f"PRAGMA {pragma}").scalar()
+            for pragma in SQLITE_PRAGMA_ENV
+        }
+
+
 @st.cache_resource
 def get_engine():
     # Ensure data directory exists if using default SQLite
@@ -22,18 +98,173 @@ def get_engine():
     else:
         connect_args = {}
 
-    return create_engine(
+    engine = create_engine(
         DB_URL,
         connect_args=connect_args,
         pool_pre_ping=True,  # Check connection validity before usage
         pool_recycle=3600,  # Recycle connections every hour
     )
+    if engine.dialect.name == "sqlite":
+        _install_sqlite_pragmas(engine, get_sqlite_pragmas())
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+class SharedConnectionSession(Session):
+    """
+    Session that can keep a single connection for its whole life.
+
+    With shared_connection=True (see unit_of_work) the connection is
+    checked out on the first query only, and kept across commits instead
+    of going back to the pool after each one.
+    """
+
+    def __init__(self, *args, shared_connection=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._shared = shared_connection
+        self._shared_connection = None
+
+    def get_bind(self, *args, **kwargs):
+        bind = super().get_bind(*args, **kwargs)
+        if not self._shared:
+            return bind
+        if self._shared_connection is None:
+            self._shared_connection = bind.connect()
+        return self._shared_connection
+
+    def close(self):
+        super().close()
+        if self._shared_connection is not None:
+            self._shared_connection.close()
+            self._shared_connection = None
 
 
 @st.cache_resource
 def get_session_factory():
     engine = get_engine()
-    return sessionmaker(bind=engine, autoflush=False)
+    factory = sessionmaker(bind=engine, autoflush=False, class_=SharedConnectionSession)
+    event.listen(factory, "do_orm_execute", _count_orm_rows)
+    return factory
+
+
+# --- Query instrumentation ---
+
+
+class QueryRecord:
+    __slots__ = ("statement", "duration_ms", "rowcount")
+
+    def __init__(self, statement, duration_ms, rowcount):
+        self.statement = statement
+        self.duration_ms = duration_ms
+        self.rowcount = rowcount
+
+    def __repr__(self):
+        return f"<QueryRecord(duration_ms={self.duration_ms:.2f}, rowcount={self.rowcount})>"
+
+
+class RenderStats:
+    """Queries executed while rendering one page (e.g. 'dashboard.show')."""
+
+    def __init__(self, name):
+        self.name = name
+        self.queries = []
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def total_ms(self):
+        return sum(q.duration_ms for q in self.queries)
+
+    def summary(self):
+        slowest = max(self.queries, key=lambda q: q.duration_ms, default=None)
+        return {
+            "render": self.name,
+            "query_count": self.query_count,
+            "db_ms": round(self.total_ms, 2),
+            "slowest_ms": round(slowest.duration_ms, 2) if slowest else 0.0,
+        }
+
+    def __repr__(self):
+        return f"<RenderStats(name='{self.name}', queries={self.query_count}, db_ms={self.total_ms:.2f})>"
+
+
+_current_render = ContextVar("current_render", default=None)
+_render_summaries = {}
+_render_summaries_lock = threading.Lock()
+
+
+@contextmanager
+def track_render(name):
+    """
+    Record every query executed inside the block under a page render name.
+    Usage:
+        with track_render("dashboard.show") as stats:
+            dashboard.show(user_id)
+        stats.summary()
+    """
+    stats = RenderStats(name)
+    token = _current_render.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_render.reset(token)
+        summary = stats.summary()
+        with _render_summaries_lock:
+            _render_summaries[name] = summary
+        logger.debug("Render summary: %s", summary)
+
+
+def current_render():
+    """Return the RenderStats being recorded, or None outside track_render()."""
+    return _current_render.get()
+
+
+def get_render_summaries():
+    """Return the summary of the most recent render of each page."""
+    with _render_summaries_lock:
+        return dict(_render_summaries)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_render.get() is not None:
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_render.get()
+    if stats is None or not conn.info.get("query_start_time"):
+        return
+    duration_ms = (time.perf_counter() - conn.info["query_start_time"].pop()) * 1000
+    # SELECT row counts are filled in by _count_orm_rows once fetched
+    rowcount = cursor.rowcount if cursor.rowcount >= 0 else None
+    stats.queries.append(QueryRecord(statement, duration_ms, rowcount))
+    if duration_ms >= SLOW_QUERY_MS:
+        logger.warning(
+            json.dumps(
+                {
+                    "event": "slow_query",
+                    "render": stats.name,
+                    "duration_ms": round(duration_ms, 2),
+                    "rowcount": rowcount,
+                    "statement": " ".join(statement.split()),
+                }
+            )
+        )
+
+
+def _count_orm_rows(orm_execute_state):
+    # DBAPI cursors report -1 for SELECT, so buffer ORM results to count them.
+    stats = _current_render.get()
+    if stats is None or not orm_execute_state.is_select:
+        return None
+    executed = stats.query_count
+    frozen = orm_execute_state.invoke_statement().freeze()
+    if stats.query_count > executed:
+        stats.queries[-1].rowcount = len(frozen.data)
+    return frozen()
 
 
 def get_session():
@@ -41,14 +272,70 @@ def get_session():
     return Session()
 
 
+_scoped_session = ContextVar("scoped_session", default=None)
+
+
+@contextmanager
+def unit_of_work():
+    """
+    Share one session across every provide_session() call inside the block.
+
+    app.main wraps each rerun in it, so a render checks out at most one
+    connection, only once it runs a query, and repeated primary-key
+    lookups are served from the session's identity map. Nested calls
+    reuse the outer session.
+    Usage:
+        with unit_of_work():
+            list_billers(user_id)
+            list_bills(user_id)
+    """
+    session = _scoped_session.get()
+    if session is not None:
+        yield session
+        return
+
+    # Keep one connection so commits inside the block do not return it to
+    # the pool and check out another one for the next query
+    session = get_session_factory()(shared_connection=True)
+    token = _scoped_session.set(session)
+    try:
+        yield session
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        _scoped_session.reset(token)
+        session.close()
+
+
+@contextmanager
+def outside_unit_of_work():
+    """Run the block with provide_session() opening its own sessions again."""
+    token = _scoped_session.set(None)
+    try:
+        yield
+    finally:
+        _scoped_session.reset(token)
+
+
 @contextmanager
 def provide_session():
     """
     Context manager to ensure session is closed automatically.
+    Inside unit_of_work() the shared session is used and left open.
     Usage:
         with provide_session() as session:
             session.query(...)
     """
+    session = _scoped_session.get()
+    if session is not None:
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        return
+
     session = get_session()
     try:
         yield session
@@ -59,6 +346,66 @@ def provide_session():
         session.close()
 
 
+def ensure_columns(engine):
+    """
+    Add declared columns that are missing from existing tables.
+
+    Only additive changes are handled: a new NOT NULL column needs a
+    server_default so existing rows can be filled in.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} "
+                ddl += column.type.compile(dialect=engine.dialect)
+                if column.server_default is not None:
+                    if not column.nullable:
+                        ddl += " NOT NULL"
+                    default = column.server_default.arg
+                    if isinstance(default, str):
+                        default = f"'{default}'"
+                    else:
+                        default = str(default.compile(dialect=engine.dialect))
+                    ddl += f" DEFAULT {default}"
+                logger.info(f"Adding missing column {table.name}.{column.name}")
+                conn.exec_driver_sql(ddl)
+
+
+def ensure_indexes(engine):
+    """
+    Create any declared index that is missing from an existing database.
+
+    create_all() skips tables that already exist, including their indexes,
+    so databases created before an index was declared would never get it.
+    Uses CREATE INDEX IF NOT EXISTS, as reflection skips expression indexes
+    like ix_billers_user_id_lower_name. OBSOLETE_INDEXES are dropped.
+    """
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+
+
 def init_db():
     engine = get_engine()
     Base.metadata.create_all(bind=engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
+    # lib.aggregates imports this module, so import it here
+    from lib.aggregates import ensure_monthly_totals
+
+    ensure_monthly_totals()
+    if engine.dialect.name == "sqlite":
+        logger.info(
+            "SQLite pragma profile '%s' active: %s",
+            SQLITE_PRAGMA_PROFILE,
+            read_sqlite_pragmas(engine),
+        )
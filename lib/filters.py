@@ -0,0 +1,74 @@
+from datetime import date
+from typing import NamedTuple, Optional
+
+from lib.models import Bill
+from lib.money import from_cents
+
+# Status filter matching every bill that is not paid in full yet
+OPEN_STATUS = "open"
+
+# Sort keys accepted by the bills list: key -> (label, column, descending).
+# Each column leads an index together with the user id (see lib.models).
+BILL_SORTS = {
+    "due_date": ("Due date, oldest first", Bill.due_date, False),
+    "-due_date": ("Due date, newest first", Bill.due_date, True),
+    "amount": ("Amount, lowest first", Bill.amount, False),
+    "-amount": ("Amount, highest first", Bill.amount, True),
+}
+
+
+class BillFilter(NamedTuple):
+    """
+    Filters and sort order for list_bills() and list_bills_page().
+
+    None leaves a filter out. Dates are inclusive and amounts are integer
+    cents, like the rows the helpers return. A named tuple, so it can be
+    part of a result cache key.
+    """
+
+    status: Optional[str] = None  # a stored status, or OPEN_STATUS
+    biller_id: Optional[int] = None
+    due_from: Optional[date] = None
+    due_to: Optional[date] = None
+    period_month: Optional[int] = None
+    period_year: Optional[int] = None
+    min_amount_cents: Optional[int] = None
+    max_amount_cents: Optional[int] = None
+    sort: str = "due_date"
+
+
+def status_clause(status):
+    """SQL condition for a status filter (see BillFilter.status)."""
+    if status == OPEN_STATUS:
+        return Bill.status != "paid"
+    return Bill.status == status
+
+
+def bill_filter_clauses(bill_filter):
+    """The SQL conditions a BillFilter adds to a bills query."""
+    clauses = []
+    if bill_filter.status is not None:
+        clauses.append(status_clause(bill_filter.status))
+    if bill_filter.biller_id is not None:
+        clauses.append(Bill.biller_id == bill_filter.biller_id)
+    if bill_filter.due_from is not None:
+        clauses.append(Bill.due_date >= bill_filter.due_from)
+    if bill_filter.due_to is not None:
+        clauses.append(Bill.due_date <= bill_filter.due_to)
+    if bill_filter.period_month is not None:
+        clauses.append(Bill.period_month == bill_filter.period_month)
+    if bill_filter.period_year is not None:
+        clauses.append(Bill.period_year == bill_filter.period_year)
+    if bill_filter.min_amount_cents is not None:
+        clauses.append(Bill.amount >= from_cents(bill_filter.min_amount_cents))
+    if bill_filter.max_amount_cents is not None:
+        clauses.append(Bill.amount <= from_cents(bill_filter.max_amount_cents))
+    return clauses
+
+
+def bill_sort(bill_filter):
+    """(column, descending) to order by; unknown sort keys are rejected."""
+    if bill_filter.sort not in BILL_SORTS:
+        raise ValueError(f"Unknown sort key: {bill_filter.sort}")
+    _, column, descending = BILL_SORTS[bill_filter.sort]
+    return column, descending
@@ -0,0 +1,106 @@
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# bcrypt work factor for new hashes. Stored hashes with a different cost are
+# rehashed transparently on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes for hashing; 0 runs bcrypt inline on the calling thread
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "2"))
+# Hash jobs allowed in flight at once; further callers wait for a slot
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(max(HASH_WORKERS, 1) * 4)))
+
+
+def _hash(password: bytes, rounds: int) -> str:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds)).decode()
+
+
+def _check(password: bytes, hashed: bytes) -> bool:
+    return bcrypt.checkpw(password, hashed)
+
+
+class HashingService:
+    """
+    Runs bcrypt in a process pool so hashing does not stall the Streamlit
+    script threads of other sessions served by the same process.
+    """
+
+    def __init__(
+        self, rounds=BCRYPT_ROUNDS, workers=HASH_WORKERS, max_pending=HASH_MAX_PENDING
+    ):
+        self.rounds = rounds
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        if workers > 0:
+            # spawn, not fork: the server process is multi-threaded
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+
+    def hash(self, password: str) -> str:
+        return self._run(_hash, password.encode(), self.rounds)
+
+    def verify(self, password: str, hashed: str) -> bool:
+        try:
+            return self._run(_check, password.encode(), hashed.encode())
+        except ValueError:
+            # Not a bcrypt hash
+            return False
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Return True if the hash was made with a different work factor."""
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _run(self, func, *args):
+        executor = self._executor
+        if executor is None:
+            return func(*args)
+        with self._slots:
+            try:
+                return executor.submit(func, *args).result()
+            except BrokenProcessPool:
+                logger.error("Hashing worker pool died; hashing inline from now on")
+                self.shutdown()
+                return func(*args)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_hashing_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = HashingService()
+            atexit.register(_service.shutdown)
+        return _service
+
+
+def hash_password(password: str) -> str:
+    return get_hashing_service().hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    return get_hashing_service().verify(password, hashed)
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    return get_hashing_service().needs_rehash(hashed)
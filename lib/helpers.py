@@ -1,10 +1,47 @@
+import contextvars
+import operator
+import os
+import random
+import re
 import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from decimal import Decimal
 
+from sqlalchemy import (
+    String,
+    and_,
+    case,
+    func,
+    insert,
+    select,
+    tuple_,
+    type_coerce,
+    union,
+    update,
+)
 from sqlalchemy.orm import joinedload
-import streamlit_authenticator as stauth
+from sqlalchemy.orm.exc import StaleDataError
 
-from lib.db import provide_session
+from lib import hashing
+from lib.aggregates import (
+    MonthlyDeltas,
+    apply_monthly_deltas,
+    bill_totals,
+    monthly_key,
+)
+from lib.cache import cached_per_user, invalidate_user
+from lib.db import outside_unit_of_work, provide_session
+from lib.filters import (
+    BillFilter,
+    bill_filter_clauses,
+    bill_sort,
+    status_clause,
+)
+from lib.importer import SkippedCredit
+from lib.money import sql_cents, to_cents
 from lib.models import (
     Biller,
     Bill,
@@ -13,6 +50,64 @@ from lib.models import (
     UserAuth,
     UserProfile,
     PasswordResetToken,
+    MonthlyTotal,
+)
+from lib.rows import BillerRow, BillRow, PaymentHistoryRow, PaymentRow
+
+# Optimistic concurrency: how often a payment is retried after losing a
+# compare-and-swap on Bill.version, and the base of the exponential backoff
+PAYMENT_MAX_RETRIES = int(os.getenv("PAYMENT_MAX_RETRIES", "10"))
+PAYMENT_RETRY_BACKOFF = float(os.getenv("PAYMENT_RETRY_BACKOFF", "0.005"))
+# Bills imported per transaction, and parse errors kept for the summary
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "500"))
+IMPORT_MAX_ERRORS = 50
+# Rows per page for the keyset-paginated list helpers
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "50"))
+# Threads shared by every session for fetch_concurrently(); 0 runs inline
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "4"))
+
+# Columns selected by the list_* helpers, in the field order of lib.rows
+BILLER_ROW_COLUMNS = (
+    Biller.id,
+    Biller.name,
+    Biller.biller_type,
+    Biller.account,
+    Biller.notes,
+)
+BILL_ROW_COLUMNS = (
+    Bill.id,
+    Bill.biller_id,
+    Biller.name.label("biller_name"),
+    sql_cents(Bill.amount).label("amount_cents"),
+    sql_cents(func.coalesce(Bill.balance_amount, Bill.amount)).label("balance_cents"),
+    Bill.due_date,
+    Bill.period_month,
+    Bill.period_year,
+    Bill.status,
+    Bill.notes,
+)
+PAYMENT_ROW_COLUMNS = (
+    Payment.id,
+    Payment.bill_id,
+    Biller.name.label("biller_name"),
+    sql_cents(Payment.amount).label("amount_cents"),
+    Payment.paid_on,
+    Payment.status,
+    Payment.method,
+    Payment.reference,
+)
+PAYMENT_HISTORY_ROW_COLUMNS = (
+    PaymentHistory.id,
+    PaymentHistory.bill_id,
+    PaymentHistory.biller_name,
+    sql_cents(PaymentHistory.amount).label("amount_cents"),
+    sql_cents(PaymentHistory.balance_amount).label("balance_cents"),
+    PaymentHistory.due_date,
+    PaymentHistory.paid_on,
+    PaymentHistory.status,
+    PaymentHistory.method,
+    PaymentHistory.reference,
+    PaymentHistory.transaction_timestamp,
 )
 
 # --- Auth Helpers ---
@@ -20,7 +115,7 @@ from lib.models import (
 
 def hash_password(password: str) -> str:
     """Hash a password for storing."""
-    return stauth.Hasher().hash(password)
+    return hashing.hash_password(password)
 
 
 def register_user(username, password, full_name=None, email=None):
@@ -28,7 +123,9 @@ def register_user(username, password, full_name=None, email=None):
         if db.query(UserAuth).filter_by(username=username).first():
             raise ValueError("Username already exists")
 
-        hashed = hash_password(password)
+    # Hash without holding a session; bcrypt runs in the worker pool
+    hashed = hash_password(password)
+    with provide_session() as db:
         user = UserAuth(username=username, password_hash=hashed)
         db.add(user)
         db.flush()  # Generate ID
@@ -66,30 +163,53 @@ def get_user_by_password_reset_token(token: str):
 
 def change_user_password(user_id: int, new_password: str):
     """Change a user's password."""
+    new_hash = hash_password(new_password)
     with provide_session() as db:
-        user = db.query(UserAuth).filter_by(id=user_id).first()
+        user = db.get(UserAuth, user_id)
         if not user:
             raise ValueError("User not found")
-        user.password_hash = hash_password(new_password)
+        user.password_hash = new_hash
         # Invalidate all reset tokens for the user after password change
         db.query(PasswordResetToken).filter_by(user_id=user_id).delete()
         db.commit()
 
 
+def upgrade_password_hash(user_id: int, password: str, current_hash: str) -> bool:
+    """Rehash a verified password if it was stored with another work factor."""
+    if not hashing.password_needs_rehash(current_hash):
+        return False
+    new_hash = hash_password(password)
+    with provide_session() as db:
+        db.query(UserAuth).filter_by(id=user_id, password_hash=current_hash).update(
+            {UserAuth.password_hash: new_hash}
+        )
+        db.commit()
+    return True
+
+
 def get_user_by_username_or_email(identifier: str):
     """Find a user by their username or email."""
     with provide_session() as db:
+        # A UNION of two probes lets each side use its own unique index,
+        # where an OR across the join would not
+        matching_ids = union(
+            select(UserAuth.id.label("id")).where(UserAuth.username == identifier),
+            select(UserProfile.user_auth_id).where(UserProfile.email == identifier),
+        ).subquery()
         user = (
             db.query(UserAuth)
-            .join(UserProfile)
-            .filter(
-                (UserAuth.username == identifier) | (UserProfile.email == identifier)
-            )
+            .filter(UserAuth.id.in_(select(matching_ids.c.id)))
             .first()
         )
         return user
 
 
+def get_user_id_by_username(username: str):
+    """Resolve a username to its user id with a single index probe."""
+    with provide_session() as db:
+        return db.query(UserAuth.id).filter(UserAuth.username == username).scalar()
+
+
 # CRUD helpers
 
 
@@ -103,48 +223,48 @@ def add_biller(user_id, name, biller_type=None, account=None, notes=None):
             notes=notes,
         )
         db.add(b)
+        invalidate_user(db, user_id)
         db.commit()
         db.refresh(b)
         return b
 
 
+@cached_per_user
 def list_billers(user_id):
     with provide_session() as db:
         rows = (
-            db.query(Biller)
+            db.query(*BILLER_ROW_COLUMNS)
             .filter(Biller.user_id == user_id)
             .order_by(Biller.name)
             .all()
         )
-        return rows
+        return [BillerRow._make(r) for r in rows]
 
 
 def update_biller(user_id, biller_id, name, biller_type=None, account=None, notes=None):
     with provide_session() as db:
-        biller = (
-            db.query(Biller)
-            .filter(Biller.id == biller_id, Biller.user_id == user_id)
-            .first()
-        )
-        if not biller:
+        biller = db.get(Biller, biller_id)
+        if not biller or biller.user_id != user_id:
             raise ValueError(f"Biller with ID {biller_id} not found")
         biller.name = name
         biller.biller_type = biller_type
         biller.account = account
         biller.notes = notes
+        invalidate_user(db, user_id)
         db.commit()
 
 
 def delete_biller(user_id, biller_id):
     with provide_session() as db:
-        biller = (
-            db.query(Biller)
-            .filter(Biller.id == biller_id, Biller.user_id == user_id)
-            .first()
-        )
-        if not biller:
+        biller = db.get(Biller, biller_id)
+        if not biller or biller.user_id != user_id:
             raise ValueError(f"Biller with ID {biller_id} not found")
         db.delete(biller)
+        # Its bills go with it (cascade), and so do their monthly totals
+        db.query(MonthlyTotal).filter(MonthlyTotal.biller_id == biller_id).delete(
+            synchronize_session=False
+        )
+        invalidate_user(db, user_id)
         db.commit()
 
 
@@ -170,33 +290,166 @@ def add_bill(
             status="unpaid",
         )
         db.add(bill)
+        deltas = MonthlyDeltas()
+        deltas.add(
+            monthly_key(biller_id, due_date), bill_totals(amount, amount, "unpaid")
+        )
+        apply_monthly_deltas(db, user_id, deltas)
+        invalidate_user(db, user_id)
         db.commit()
         db.refresh(bill)
         return bill
 
 
-def list_bills(user_id):
+def _query_bill_rows(db):
+    return db.query(*BILL_ROW_COLUMNS).outerjoin(Biller, Bill.biller_id == Biller.id)
+
+
+@cached_per_user
+def list_bills(user_id, bill_filter=None):
+    """Every bill matching `bill_filter` (a lib.filters.BillFilter)."""
+    bill_filter = bill_filter or BillFilter()
+    column, descending = bill_sort(bill_filter)
+    order = (column.desc(), Bill.id.desc()) if descending else (column, Bill.id)
     with provide_session() as db:
         rows = (
-            db.query(Bill)
-            .filter(Bill.user_id == user_id)
-            .options(joinedload(Bill.biller))
-            .order_by(Bill.due_date)
+            _query_bill_rows(db)
+            .filter(Bill.user_id == user_id, *bill_filter_clauses(bill_filter))
+            .order_by(*order)
             .all()
         )
-        return rows
+        return [BillRow._make(r) for r in rows]
+
+
+def import_bills(user_id, rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Insert parsed bill rows (see lib.importer) in chunks.
+
+    Biller names are resolved through an in-memory map seeded from
+    list_billers; missing billers are created in bulk per chunk. Rows whose
+    (biller, period, amount) already exists are skipped as duplicates.
+    Only one chunk is held in memory at a time, so memory stays flat
+    regardless of the file size. Rows that are exceptions (parse errors)
+    are counted and reported, not inserted; SkippedCredit rows (deposits
+    and other credits) are only counted.
+    """
+    summary = {
+        "imported": 0,
+        "duplicates": 0,
+        "billers_created": 0,
+        "invalid": 0,
+        "credits_skipped": 0,
+        "errors": [],
+    }
+    billers = {b.name: b.id for b in list_billers(user_id)}
+
+    chunk = []
+    for row in rows:
+        if isinstance(row, SkippedCredit):
+            summary["credits_skipped"] += 1
+            continue
+        if isinstance(row, Exception):
+            summary["invalid"] += 1
+            if len(summary["errors"]) < IMPORT_MAX_ERRORS:
+                summary["errors"].append(str(row))
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            _import_bill_chunk(user_id, chunk, billers, summary)
+            chunk = []
+    if chunk:
+        _import_bill_chunk(user_id, chunk, billers, summary)
+    return summary
+
+
+def _import_bill_chunk(user_id, chunk, billers, summary):
+    with provide_session() as db:
+        new_billers = {}
+        for row in chunk:
+            if row["biller"] not in billers:
+                new_billers.setdefault(row["biller"], row.get("biller_type"))
+        if new_billers:
+            db.execute(
+                insert(Biller.__table__),
+                [
+                    {"user_id": user_id, "name": name, "biller_type": b_type or "Other"}
+                    for name, b_type in new_billers.items()
+                ],
+            )
+            billers.update(
+                db.execute(
+                    select(Biller.name, Biller.id).where(
+                        Biller.user_id == user_id, Biller.name.in_(new_billers)
+                    )
+                ).all()
+            )
+            summary["billers_created"] += len(new_billers)
+
+        keys = [
+            (
+                billers[row["biller"]],
+                row["period_year"],
+                row["period_month"],
+                row["amount"],
+            )
+            for row in chunk
+        ]
+        existing = set(
+            db.execute(
+                select(
+                    Bill.biller_id, Bill.period_year, Bill.period_month, Bill.amount
+                ).where(
+                    tuple_(
+                        Bill.biller_id, Bill.period_year, Bill.period_month, Bill.amount
+                    ).in_(set(keys))
+                )
+            ).all()
+        )
+
+        new_bills = []
+        for key, row in zip(keys, chunk):
+            if key in existing:
+                summary["duplicates"] += 1
+                continue
+            existing.add(key)
+            new_bills.append(
+                {
+                    "user_id": user_id,
+                    "biller_id": key[0],
+                    "amount": row["amount"],
+                    "balance_amount": row["amount"],
+                    "due_date": row["due_date"],
+                    "period_month": row["period_month"],
+                    "period_year": row["period_year"],
+                    "notes": row.get("notes"),
+                    "status": "unpaid",
+                }
+            )
+        if new_bills:
+            db.execute(insert(Bill.__table__), new_bills)
+            deltas = MonthlyDeltas()
+            for bill in new_bills:
+                deltas.add(
+                    monthly_key(bill["biller_id"], bill["due_date"]),
+                    bill_totals(bill["amount"], bill["amount"], "unpaid"),
+                )
+            apply_monthly_deltas(db, user_id, deltas)
+        if new_billers or new_bills:
+            invalidate_user(db, user_id)
+        db.commit()
+        summary["imported"] += len(new_bills)
 
 
+@cached_per_user
 def list_unpaid_bills(user_id):
     with provide_session() as db:
         rows = (
-            db.query(Bill)
-            .options(joinedload(Bill.biller))
+            _query_bill_rows(db)
             .filter(Bill.user_id == user_id, Bill.status != "paid")
             .order_by(Bill.due_date)
             .all()
         )
-        return rows
+        return [BillRow._make(r) for r in rows]
 
 
 def update_bill(
@@ -211,12 +464,27 @@ def update_bill(
     status=None,
 ):
     with provide_session() as db:
-        bill = (
-            db.query(Bill).filter(Bill.id == bill_id, Bill.user_id == user_id).first()
-        )
-        if not bill:
+        bill = db.get(Bill, bill_id)
+        if not bill or bill.user_id != user_id:
             raise ValueError(f"Bill with ID {bill_id} not found")
 
+        # Balance from an SQL SUM over the bill's payments instead of
+        # loading every Payment into Python; the version check on flush
+        # rejects the update if a payment lands in between
+        total_paid, paid_cents = (
+            db.query(
+                func.coalesce(func.sum(Payment.amount), 0),
+                func.coalesce(func.sum(sql_cents(Payment.amount)), 0),
+            )
+            .filter(Payment.bill_id == bill.id)
+            .one()
+        )
+        deltas = MonthlyDeltas()
+        deltas.subtract(
+            monthly_key(bill.biller_id, bill.due_date),
+            bill_totals(bill.amount, bill.balance_amount, bill.status, paid_cents),
+        )
+
         bill.biller_id = biller_id
         bill.amount = amount
         bill.due_date = due_date
@@ -226,20 +494,42 @@ def update_bill(
         if status:
             bill.status = status
 
-        total_paid = sum([p.amount for p in bill.payments])
-        bill.balance_amount = bill.amount - total_paid
+        bill.balance_amount = Decimal(str(amount)) - Decimal(total_paid)
+        deltas.add(
+            monthly_key(biller_id, due_date),
+            bill_totals(amount, bill.balance_amount, bill.status, paid_cents),
+        )
 
+        try:
+            db.flush()
+        except StaleDataError:
+            raise ValueError(
+                f"Bill with ID {bill_id} was changed by another session, "
+                "please reload and try again"
+            )
+        apply_monthly_deltas(db, user_id, deltas)
+        invalidate_user(db, user_id)
         db.commit()
 
 
 def delete_bill(user_id, bill_id):
     with provide_session() as db:
-        bill = (
-            db.query(Bill).filter(Bill.id == bill_id, Bill.user_id == user_id).first()
-        )
-        if not bill:
+        bill = db.get(Bill, bill_id)
+        if not bill or bill.user_id != user_id:
             raise ValueError(f"Bill with ID {bill_id} not found")
+        paid_cents = (
+            db.query(func.coalesce(func.sum(sql_cents(Payment.amount)), 0))
+            .filter(Payment.bill_id == bill.id)
+            .scalar()
+        )
+        deltas = MonthlyDeltas()
+        deltas.subtract(
+            monthly_key(bill.biller_id, bill.due_date),
+            bill_totals(bill.amount, bill.balance_amount, bill.status, paid_cents),
+        )
         db.delete(bill)
+        apply_monthly_deltas(db, user_id, deltas)
+        invalidate_user(db, user_id)
         db.commit()
 
 
@@ -255,79 +545,598 @@ def add_payment(
 ):
     if paid_on is None:
         paid_on = datetime.today().date()
+    amount = Decimal(str(amount))
 
-    with provide_session() as db:
-        bill = (
-            db.query(Bill)
-            .options(joinedload(Bill.biller))
-            .filter(Bill.id == bill_id, Bill.user_id == user_id)
-            .first()
-        )
+    for attempt in range(PAYMENT_MAX_RETRIES):
+        with provide_session() as db:
+            # populate_existing: never compute from a stale identity-map copy
+            bill = db.get(
+                Bill,
+                bill_id,
+                options=[joinedload(Bill.biller)],
+                populate_existing=True,
+            )
 
-        if not bill:
-            raise ValueError("Bill not found or access denied")
+            if not bill or bill.user_id != user_id:
+                raise ValueError("Bill not found or access denied")
 
-        p = Payment(
-            user_id=user_id,
-            bill_id=bill_id,
-            amount=amount,
-            paid_on=paid_on,
-            method=method,
-            reference=reference,
-            notes=notes,
-            status=status,
-        )
-        db.add(p)
-        db.flush()
+            outstanding = (
+                bill.balance_amount if bill.balance_amount is not None else bill.amount
+            )
+            balance_amount = outstanding - amount
+            final_status = "paid" if balance_amount <= 0 else "partial"
+            bill_status = bill.status
+            if balance_amount <= 0 or balance_amount < bill.amount:
+                bill_status = final_status
 
-        total_paid = sum([pay.amount for pay in bill.payments])
-        bill.balance_amount = bill.amount - total_paid
+            # Compare-and-swap on the version read above: if another session
+            # posted in between, nothing is updated and we retry
+            swapped = db.execute(
+                update(Bill)
+                .where(Bill.id == bill.id, Bill.version == bill.version)
+                .values(
+                    balance_amount=balance_amount,
+                    status=bill_status,
+                    version=bill.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if swapped != 1:
+                db.rollback()
+                time.sleep(random.uniform(0, PAYMENT_RETRY_BACKOFF * 2**attempt))
+                continue
 
-        final_status = "partial"
-        if total_paid >= bill.amount:
-            bill.status = "paid"
-            final_status = "paid"
-        elif 0 < total_paid < bill.amount:
-            bill.status = "partial"
-            final_status = "partial"
+            p = Payment(
+                user_id=user_id,
+                bill_id=bill_id,
+                amount=amount,
+                paid_on=paid_on,
+                method=method,
+                reference=reference,
+                notes=notes,
+                status=status,
+            )
+            db.add(p)
 
-        history = PaymentHistory(
-            user_id=user_id,
-            bill_id=bill.id,
-            biller_name=bill.biller.name if bill.biller else "Unknown",
-            amount=amount,
-            balance_amount=bill.balance_amount,
-            due_date=bill.due_date,
-            paid_on=paid_on,
-            status=final_status,
-            method=method,
-            reference=reference,
-        )
-        db.add(history)
+            history = PaymentHistory(
+                user_id=user_id,
+                bill_id=bill.id,
+                biller_name=bill.biller.name if bill.biller else "Unknown",
+                amount=amount,
+                balance_amount=balance_amount,
+                due_date=bill.due_date,
+                paid_on=paid_on,
+                status=final_status,
+                method=method,
+                reference=reference,
+            )
+            db.add(history)
+
+            key = monthly_key(bill.biller_id, bill.due_date)
+            deltas = MonthlyDeltas()
+            deltas.subtract(key, bill_totals(bill.amount, outstanding, bill.status))
+            deltas.add(
+                key,
+                bill_totals(bill.amount, balance_amount, bill_status, to_cents(amount)),
+            )
+            apply_monthly_deltas(db, user_id, deltas)
+
+            invalidate_user(db, user_id)
+            db.commit()
+            db.refresh(p)
+            return p
+
+    raise ValueError(
+        "The bill was updated by another session too many times, please try again"
+    )
+
+
+def add_payments_bulk(user_id, payments):
+    """
+    Post many payments in one transaction, e.g. from a bank statement.
+
+    Each entry is a dict with bill_id and amount, plus optional paid_on,
+    method, reference, notes and status as for add_payment(). Ownership is
+    checked with one IN query, rows are inserted with executemany and all
+    affected balances are swapped by a single UPDATE guarded on the
+    versions read, retrying the whole batch if another session got there
+    first. Returns the number of payments posted.
+    """
+    today = datetime.today().date()
+    entries = [
+        {
+            **entry,
+            "amount": Decimal(str(entry["amount"])),
+            "paid_on": entry.get("paid_on") or today,
+        }
+        for entry in payments
+    ]
+    if not entries:
+        return 0
+    bill_ids = {entry["bill_id"] for entry in entries}
+
+    for attempt in range(PAYMENT_MAX_RETRIES):
+        with provide_session() as db:
+            bills = {
+                row.id: row
+                for row in db.execute(
+                    select(
+                        Bill.id,
+                        Bill.amount,
+                        Bill.balance_amount,
+                        Bill.status,
+                        Bill.version,
+                        Bill.biller_id,
+                        Bill.due_date,
+                        Biller.name.label("biller_name"),
+                    )
+                    .join(Bill.biller)
+                    .where(Bill.id.in_(bill_ids), Bill.user_id == user_id)
+                )
+            }
+            missing = bill_ids - bills.keys()
+            if missing:
+                raise ValueError(f"Bills not found or access denied: {sorted(missing)}")
+
+            balances = {
+                bill.id: (
+                    bill.balance_amount
+                    if bill.balance_amount is not None
+                    else bill.amount
+                )
+                for bill in bills.values()
+            }
+            statuses = {bill.id: bill.status for bill in bills.values()}
+            payment_rows = []
+            history_rows = []
+            for entry in entries:
+                bill = bills[entry["bill_id"]]
+                balances[bill.id] -= entry["amount"]
+                final_status = "paid" if balances[bill.id] <= 0 else "partial"
+                if balances[bill.id] <= 0 or balances[bill.id] < bill.amount:
+                    statuses[bill.id] = final_status
+
+                payment_rows.append(
+                    {
+                        "user_id": user_id,
+                        "bill_id": bill.id,
+                        "amount": entry["amount"],
+                        "paid_on": entry["paid_on"],
+                        "method": entry.get("method"),
+                        "reference": entry.get("reference"),
+                        "notes": entry.get("notes"),
+                        "status": entry.get("status"),
+                    }
+                )
+                history_rows.append(
+                    {
+                        "user_id": user_id,
+                        "bill_id": bill.id,
+                        "biller_name": bill.biller_name,
+                        "amount": entry["amount"],
+                        "balance_amount": balances[bill.id],
+                        "due_date": bill.due_date,
+                        "paid_on": entry["paid_on"],
+                        "status": final_status,
+                        "method": entry.get("method"),
+                        "reference": entry.get("reference"),
+                    }
+                )
+
+            # One UPDATE for every affected bill, matching only the versions
+            # read above
+            swapped = db.execute(
+                update(Bill)
+                .where(
+                    tuple_(Bill.id, Bill.version).in_(
+                        [(bill.id, bill.version) for bill in bills.values()]
+                    )
+                )
+                .values(
+                    balance_amount=case(balances, value=Bill.id),
+                    status=case(statuses, value=Bill.id),
+                    version=Bill.version + 1,
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if swapped != len(bills):
+                db.rollback()
+                time.sleep(random.uniform(0, PAYMENT_RETRY_BACKOFF * 2**attempt))
+                continue
+
+            # Core inserts keep each batch a single executemany; ORM bulk
+            # inserts split it by which optional values are None
+            db.execute(insert(Payment.__table__), payment_rows)
+            db.execute(insert(PaymentHistory.__table__), history_rows)
+
+            deltas = MonthlyDeltas()
+            paid_cents = {bill_id: 0 for bill_id in bills}
+            for entry in entries:
+                paid_cents[entry["bill_id"]] += to_cents(entry["amount"])
+            for bill in bills.values():
+                key = monthly_key(bill.biller_id, bill.due_date)
+                deltas.subtract(
+                    key, bill_totals(bill.amount, bill.balance_amount, bill.status)
+                )
+                deltas.add(
+                    key,
+                    bill_totals(
+                        bill.amount,
+                        balances[bill.id],
+                        statuses[bill.id],
+                        paid_cents[bill.id],
+                    ),
+                )
+            apply_monthly_deltas(db, user_id, deltas)
+            invalidate_user(db, user_id)
+            db.commit()
+            return len(payment_rows)
+
+    raise ValueError(
+        "The bills were updated by another session too many times, please try again"
+    )
 
-        db.commit()
-        db.refresh(p)
-        return p
 
+def _query_payment_rows(db):
+    return (
+        db.query(*PAYMENT_ROW_COLUMNS)
+        .outerjoin(Bill, Payment.bill_id == Bill.id)
+        .outerjoin(Biller, Bill.biller_id == Biller.id)
+    )
 
+
+@cached_per_user
 def list_payments(user_id):
     with provide_session() as db:
         rows = (
-            db.query(Payment)
+            _query_payment_rows(db)
             .filter(Payment.user_id == user_id)
-            .options(joinedload(Payment.bill).joinedload(Bill.biller))
             .order_by(Payment.paid_on.desc())
             .all()
         )
-        return rows
+        return [PaymentRow._make(r) for r in rows]
 
 
+@cached_per_user
 def list_payment_history(user_id):
     with provide_session() as db:
         rows = (
-            db.query(PaymentHistory)
+            db.query(*PAYMENT_HISTORY_ROW_COLUMNS)
             .filter(PaymentHistory.user_id == user_id)
             .order_by(PaymentHistory.transaction_timestamp.desc())
             .all()
         )
-        return rows
+        return [PaymentHistoryRow._make(r) for r in rows]
+
+
+def _keyset_page(
+    query, row_type, sort_column, id_column, after, limit, descending=False
+):
+    """
+    Fetch one page of a projection query ordered by (sort_column, id_column).
+
+    `after` is the cursor returned with the previous page, or None for the
+    first page. Rows are read with a range seek on the ordering columns, so
+    every page costs the same no matter how deep it is. Rows whose sort
+    value is NULL come last. Returns (rows, next_cursor) with the rows built
+    as row_type, whose first field must be the id; next_cursor is None on
+    the last page.
+    """
+    # The cursor keeps the sort value as stored, so it compares exactly
+    # (SQLite stores timestamps as text with varying precision)
+    query = query.add_columns(type_coerce(sort_column, String))
+    past = operator.lt if descending else operator.gt
+    if descending:
+        order = (sort_column.desc(), id_column.desc())
+    else:
+        order = (sort_column, id_column)
+    nullable = sort_column.expression.nullable
+
+    rows = []
+    if after is None or after[0] is not None:
+        seek = query
+        if nullable:
+            seek = seek.filter(sort_column.isnot(None))
+        if after is not None:
+            seek = seek.filter(past(tuple_(sort_column, id_column), tuple_(*after)))
+        rows = seek.order_by(*order).limit(limit + 1).all()
+    if nullable and len(rows) <= limit:
+        tail = query.filter(sort_column.is_(None))
+        if after is not None and after[0] is None:
+            tail = tail.filter(past(id_column, after[1]))
+        rows += tail.order_by(order[1]).limit(limit + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][-1], rows[-1][0])
+    return [row_type._make(r[:-1]) for r in rows], next_cursor
+
+
+def _name_prefix(column, prefix):
+    """
+    Filter for values starting with `prefix`, ignoring case.
+
+    Compares lower(column) as a range, so an index on that expression can
+    seek it (see ix_billers_user_id_lower_name). SQLite's lower() folds
+    ASCII letters only.
+    """
+    prefix = prefix.lower()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    lowered = func.lower(column)
+    return and_(lowered >= prefix, lowered < upper)
+
+
+@cached_per_user
+def list_billers_page(user_id, after=None, limit=PAGE_SIZE, search=None):
+    """Billers ordered by name, one keyset page at a time."""
+    with provide_session() as db:
+        query = db.query(*BILLER_ROW_COLUMNS).filter(Biller.user_id == user_id)
+        if search:
+            query = query.filter(_name_prefix(Biller.name, search))
+        return _keyset_page(query, BillerRow, Biller.name, Biller.id, after, limit)
+
+
+def _due_date_range(text):
+    """
+    Parse "YYYY", "YYYY-MM" or "YYYY-MM-DD" into a [start, end) date range.
+
+    Returns None when the text is not such a date.
+    """
+    if not re.fullmatch(r"\d{4}(-\d{2}){0,2}", text):
+        return None
+    parts = [int(part) for part in text.split("-")]
+    try:
+        start = datetime(*parts, *(1,) * (3 - len(parts))).date()
+        if len(parts) == 3:
+            return start, start + timedelta(days=1)
+        if len(parts) == 2:
+            return start, (start + timedelta(days=31)).replace(day=1)
+        return start, start.replace(year=start.year + 1)
+    except (ValueError, OverflowError):
+        return None
+
+
+@cached_per_user
+def search_bills(user_id, query, status=None, limit=20):
+    """
+    Bills for a type-ahead selector, ordered by due date.
+
+    `query` is either a due date prefix ("2026", "2026-03", "2026-03-15"),
+    matched as a date range, or the start of the biller name, ignoring
+    case; an empty query matches every bill.
+    `status` keeps only bills with that status, or with any status but
+    "paid" for lib.filters.OPEN_STATUS. At most `limit` rows are returned.
+    """
+    query = query.strip()
+    with provide_session() as db:
+        rows = _query_bill_rows(db).filter(Bill.user_id == user_id)
+        if status is not None:
+            rows = rows.filter(status_clause(status))
+
+        due_range = _due_date_range(query) if query else None
+        if due_range:
+            rows = rows.filter(Bill.due_date >= due_range[0])
+            rows = rows.filter(Bill.due_date < due_range[1])
+        elif query:
+            # The matching billers come from a seek on
+            # ix_billers_user_id_lower_name
+            billers = select(Biller.id).where(
+                Biller.user_id == user_id, _name_prefix(Biller.name, query)
+            )
+            rows = rows.filter(Bill.biller_id.in_(billers))
+
+        rows = rows.order_by(Bill.due_date, Bill.id).limit(limit).all()
+        return [BillRow._make(r) for r in rows]
+
+
+@cached_per_user
+def list_bills_page(user_id, after=None, limit=PAGE_SIZE, bill_filter=None):
+    """Bills matching `bill_filter`, in its sort order, one keyset page at a time."""
+    bill_filter = bill_filter or BillFilter()
+    column, descending = bill_sort(bill_filter)
+    with provide_session() as db:
+        query = _query_bill_rows(db).filter(
+            Bill.user_id == user_id, *bill_filter_clauses(bill_filter)
+        )
+        return _keyset_page(
+            query, BillRow, column, Bill.id, after, limit, descending=descending
+        )
+
+
+@cached_per_user
+def list_payments_page(user_id, after=None, limit=PAGE_SIZE):
+    """Payments, most recent first, one keyset page at a time."""
+    with provide_session() as db:
+        query = _query_payment_rows(db).filter(Payment.user_id == user_id)
+        return _keyset_page(
+            query,
+            PaymentRow,
+            Payment.paid_on,
+            Payment.id,
+            after,
+            limit,
+            descending=True,
+        )
+
+
+@cached_per_user
+def list_payment_history_page(user_id, after=None, limit=PAGE_SIZE):
+    """Payment history, most recent first, one keyset page at a time."""
+    with provide_session() as db:
+        query = db.query(*PAYMENT_HISTORY_ROW_COLUMNS).filter(
+            PaymentHistory.user_id == user_id
+        )
+        return _keyset_page(
+            query,
+            PaymentHistoryRow,
+            PaymentHistory.transaction_timestamp,
+            PaymentHistory.id,
+            after,
+            limit,
+            descending=True,
+        )
+
+
+# Dashboard aggregates
+
+
+def get_dashboard_summary(user_id, window_days=180):
+    """
+    Compute the dashboard KPIs and chart series with SQL aggregates.
+
+    Only grouped rows leave the database, so the cost no longer grows with
+    the number of Bill/Payment objects a user has accumulated. Money is
+    summed as integer cents.
+    """
+    # Today is part of the cache key, so the chart window moves at midnight
+    # even for users who write nothing
+    return _dashboard_summary(user_id, datetime.today().date(), window_days)
+
+
+@cached_per_user
+def _dashboard_summary(user_id, end_date, window_days):
+    start_date = end_date - timedelta(days=window_days)
+
+    # Use balance_amount for outstanding if available, else the bill amount
+    outstanding = sql_cents(func.coalesce(Bill.balance_amount, Bill.amount))
+    is_unpaid = Bill.status != "paid"
+
+    with provide_session() as db:
+        bill_count, pending_count, total_outstanding = (
+            db.query(
+                func.count(Bill.id),
+                func.coalesce(func.sum(case((is_unpaid, 1), else_=0)), 0),
+                func.coalesce(func.sum(case((is_unpaid, outstanding), else_=0)), 0),
+            )
+            .filter(Bill.user_id == user_id)
+            .one()
+        )
+
+        biller_count = (
+            db.query(func.count(Biller.id)).filter(Biller.user_id == user_id).scalar()
+        )
+
+        # The chart reads the materialized per-month totals (whole months)
+        # instead of grouping every bill in the window
+        start_month = tuple_(start_date.year, start_date.month)
+        end_month = tuple_(end_date.year, end_date.month)
+        month_key = tuple_(MonthlyTotal.year, MonthlyTotal.month)
+        monthly = (
+            db.query(
+                MonthlyTotal.year, MonthlyTotal.month, func.sum(MonthlyTotal.billed)
+            )
+            .filter(
+                MonthlyTotal.user_id == user_id,
+                month_key >= start_month,
+                month_key <= end_month,
+            )
+            .group_by(MonthlyTotal.year, MonthlyTotal.month)
+            .having(func.sum(MonthlyTotal.billed) != 0)
+            .order_by(MonthlyTotal.year, MonthlyTotal.month)
+            .all()
+        )
+
+        by_biller = (
+            db.query(Biller.name, func.sum(outstanding))
+            .join(Bill.biller)
+            .filter(Bill.user_id == user_id, is_unpaid)
+            .group_by(Biller.id, Biller.name)
+            .order_by(Biller.name)
+            .all()
+        )
+
+    return {
+        "bill_count": bill_count,
+        "biller_count": biller_count,
+        "pending_count": pending_count,
+        "total_outstanding_cents": total_outstanding,
+        "monthly_cents": [
+            (f"{int(y):04d}-{int(m):02d}", total) for y, m, total in monthly
+        ],
+        "outstanding_by_biller_cents": [(name, total) for name, total in by_biller],
+    }
+
+
+# Concurrent reads
+
+_fetch_pool = None
+_fetch_pool_lock = threading.Lock()
+_in_fetch_worker = contextvars.ContextVar("in_fetch_worker", default=False)
+
+
+def _get_fetch_pool():
+    global _fetch_pool
+    with _fetch_pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(
+                max_workers=FETCH_WORKERS, thread_name_prefix="fetch"
+            )
+        return _fetch_pool
+
+
+def _run_fetch(call):
+    _in_fetch_worker.set(True)
+    # Never share the rerun's session across threads: every call checks
+    # out its own connection from the engine pool
+    with outside_unit_of_work():
+        return call()
+
+
+def fetch_concurrently(*calls):
+    """
+    Run independent read helpers in parallel and return their results in order.
+
+    Each call is a zero-argument callable, typically a functools.partial of
+    a list_* helper, so a page waits for its slowest query instead of the
+    sum of all of them. Calls run in a bounded thread pool with a copy of
+    the caller's context, so track_render() still sees their queries. The
+    first exception raised by a call is re-raised here.
+    Usage:
+        billers, summary = fetch_concurrently(
+            partial(list_billers, user_id),
+            partial(get_dashboard_summary, user_id),
+        )
+    """
+    if FETCH_WORKERS < 1 or len(calls) < 2 or _in_fetch_worker.get():
+        # Nested fetches run inline so they cannot starve the pool
+        return [call() for call in calls]
+
+    pool = _get_fetch_pool()
+    futures = [
+        pool.submit(contextvars.copy_context().run, _run_fetch, call) for call in calls
+    ]
+    return [future.result() for future in futures]
+
+
+def _call_key(func, args, kwargs):
+    return (func, args, tuple(sorted(kwargs.items())))
+
+
+def prefetch(*calls):
+    """
+    fetch_concurrently() the partials and map each call to its result.
+
+    Page sections look their data up with prefetched_call(), so the
+    results are handed over directly instead of being fetched again.
+    """
+    results = fetch_concurrently(*calls)
+    return {
+        _call_key(call.func, call.args, call.keywords): result
+        for call, result in zip(calls, results)
+    }
+
+
+def prefetched_call(prefetched, func, *args, **kwargs):
+    """
+    Return the prefetched result of func(*args, **kwargs), or call it.
+
+    Usable as a fetch callable, e.g. partial(prefetched_call, prefetched,
+    list_bills_page, user_id) for paginate(); calls that were not
+    prefetched, or with other arguments, simply run. `prefetched` may be
+    None.
+    """
+    key = _call_key(func, args, kwargs)
+    if prefetched and key in prefetched:
+        return prefetched[key]
+    return func(*args, **kwargs)
@@ -0,0 +1,198 @@
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+# Header names accepted for each field of a CSV bill import
+CSV_COLUMNS = {
+    "biller": ("biller", "biller_name", "payee", "name"),
+    "amount": ("amount", "total"),
+    "due_date": ("due_date", "due", "date"),
+    "period_month": ("period_month", "month"),
+    "period_year": ("period_year", "year"),
+    "biller_type": ("biller_type", "type"),
+    "notes": ("notes", "memo", "description"),
+}
+
+_OFX_TAG = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+# OFX transaction types that take money out of the account; other
+# transactions only count as bills when TRNAMT is negative
+OFX_DEBIT_TYPES = {
+    "DEBIT",
+    "PAYMENT",
+    "CHECK",
+    "FEE",
+    "SRVCHG",
+    "ATM",
+    "POS",
+    "DIRECTDEBIT",
+    "REPEATPMT",
+    "CASH",
+}
+
+
+class ImportRowError(ValueError):
+    """A single row could not be parsed; the import skips it."""
+
+    def __init__(self, line, message):
+        super().__init__(f"Line {line}: {message}")
+        self.line = line
+
+
+class SkippedCredit(Exception):
+    """A transaction that pays money in, e.g. a deposit; it is not a bill."""
+
+    def __init__(self, line):
+        super().__init__(f"Line {line}: credit, not a bill")
+        self.line = line
+
+
+def text_stream(uploaded, encoding="utf-8-sig"):
+    """Wrap a binary upload (e.g. st.file_uploader) as a line-buffered text stream."""
+    if isinstance(uploaded, io.TextIOBase):
+        return uploaded
+    return io.TextIOWrapper(uploaded, encoding=encoding, newline="")
+
+
+def parse_amount(value):
+    try:
+        amount = Decimal(str(value).replace(",", "").replace("₱", "").strip())
+    except InvalidOperation:
+        raise ValueError(f"invalid amount '{value}'")
+    # NaN/Infinity would only fail at insert time, taking the chunk with them
+    if not amount.is_finite() or amount == 0:
+        raise ValueError(f"invalid amount '{value}'")
+    return abs(amount)
+
+
+def parse_date(value):
+    """Parse ISO (2026-01-31), US (01/31/2026) or OFX (20260131[120000]) dates."""
+    value = str(value).strip()
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    if re.match(r"\d{8}", value):
+        return datetime.strptime(value[:8], "%Y%m%d").date()
+    raise ValueError(f"invalid date '{value}'")
+
+
+def _bill_row(biller, amount, due_date, period_month=None, period_year=None, **extra):
+    if not biller or not biller.strip():
+        raise ValueError("missing biller")
+    due = parse_date(due_date)
+    month = int(period_month) if period_month else due.month
+    if not 1 <= month <= 12:
+        raise ValueError(f"invalid period month '{period_month}'")
+    return {
+        "biller": biller.strip(),
+        "amount": parse_amount(amount),
+        "due_date": due,
+        # Default the billing period to the month the bill is due
+        "period_month": month,
+        "period_year": int(period_year) if period_year else due.year,
+        "biller_type": (extra.get("biller_type") or "").strip() or None,
+        "notes": (extra.get("notes") or "").strip() or None,
+    }
+
+
+def iter_csv_bills(stream):
+    """
+    Yield bill rows from a CSV stream one at a time.
+
+    Required columns are biller, amount and due_date; period_month,
+    period_year, biller_type and notes are optional. Rows that cannot be
+    parsed are yielded as ImportRowError instances instead of raising, so
+    one bad line does not abort the import. If the rest of the stream
+    cannot be decoded or split into rows, one last ImportRowError says so.
+    """
+    reader = csv.reader(stream)
+    try:
+        header = next(reader, None)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ValueError(f"Could not read the CSV file: {e}")
+    if header is None:
+        return
+    names = [re.sub(r"[\s-]+", "_", h.strip().lower()) for h in header]
+    positions = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in names:
+                positions[field] = names.index(alias)
+                break
+    missing = {"biller", "amount", "due_date"} - positions.keys()
+    if missing:
+        raise ValueError(
+            f"CSV is missing required columns: {', '.join(sorted(missing))}"
+        )
+
+    while True:
+        try:
+            record = next(reader, None)
+        except (UnicodeDecodeError, csv.Error) as e:
+            # The stream cannot be read past this point; report it like a bad
+            # row so the rows imported so far still get their summary
+            yield ImportRowError(reader.line_num + 1, f"unreadable from here on ({e})")
+            return
+        if record is None:
+            return
+        if not any(cell.strip() for cell in record):
+            continue
+        values = {
+            field: record[pos] if pos < len(record) else ""
+            for field, pos in positions.items()
+        }
+        try:
+            yield _bill_row(**values)
+        except (TypeError, ValueError) as e:
+            yield ImportRowError(reader.line_num, e)
+
+
+def iter_ofx_bills(stream):
+    """
+    Yield bill rows from the STMTTRN transactions of an OFX/QFX stream.
+
+    Works for both SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) files
+    and reads the stream line by line. NAME (or PAYEE/NAME) becomes the
+    biller, the absolute TRNAMT the amount and DTPOSTED the due date.
+    Only debits become bills: a negative TRNAMT or a TRNTYPE in
+    OFX_DEBIT_TYPES. Credits such as deposits yield SkippedCredit.
+    """
+    txn = None
+    line_num = 0
+    for line in stream:
+        line_num += 1
+        for closing, tag, value in _OFX_TAG.findall(line):
+            tag = tag.upper()
+            value = value.strip()
+            if tag == "STMTTRN":
+                if closing:
+                    if txn is not None and not _is_ofx_debit(txn):
+                        yield SkippedCredit(line_num)
+                    elif txn is not None:
+                        try:
+                            yield _bill_row(
+                                biller=txn.get("NAME") or txn.get("MEMO"),
+                                amount=txn.get("TRNAMT"),
+                                due_date=txn.get("DTPOSTED") or txn.get("DTUSER"),
+                                notes=txn.get("MEMO"),
+                            )
+                        except (TypeError, ValueError) as e:
+                            yield ImportRowError(line_num, e)
+                    txn = None
+                else:
+                    txn = {}
+            elif txn is not None and not closing and value:
+                txn.setdefault(tag, value)
+
+
+def _is_ofx_debit(txn):
+    return (
+        txn.get("TRNAMT", "").startswith("-")
+        or txn.get("TRNTYPE", "").upper() in OFX_DEBIT_TYPES
+    )
+
+
+PARSERS = {"csv": iter_csv_bills, "ofx": iter_ofx_bills, "qfx": iter_ofx_bills}
@@ -8,6 +8,7 @@ from sqlalchemy import (
     Text,
     DateTime,
     Boolean,
+    Index,
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -49,7 +50,9 @@ class UserAuth(Base):
 class UserProfile(Base):
     __tablename__ = "user_profile"
     id = Column(Integer, primary_key=True)
-    user_auth_id = Column(Integer, ForeignKey("user_auth.id"), nullable=False)
+    user_auth_id = Column(
+        Integer, ForeignKey("user_auth.id"), nullable=False, index=True
+    )
     full_name = Column(String)
     email = Column(String, unique=True, index=True)
 
@@ -83,6 +86,12 @@ class Biller(Base):
     notes = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_billers_user_id_name", user_id, name),
+        # Case-insensitive name prefix searches (see lib.helpers._name_prefix)
+        Index("ix_billers_user_id_lower_name", user_id, func.lower(name)),
+    )
+
     user = relationship("UserAuth", back_populates="billers")
     bills = relationship("Bill", back_populates="biller", cascade="all, delete-orphan")
 
@@ -95,7 +104,7 @@ class Bill(Base):
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("user_auth.id"), nullable=False)
     # Enforce that a bill must belong to a biller
-    biller_id = Column(Integer, ForeignKey("billers.id"), nullable=False)
+    biller_id = Column(Integer, ForeignKey("billers.id"), nullable=False, index=True)
     # Use Numeric for money to avoid float precision errors
     amount = Column(Numeric(10, 2), nullable=False)
     balance_amount = Column(Numeric(10, 2))
@@ -105,6 +114,26 @@ class Bill(Base):
     status = Column(String, default="unpaid")
     notes = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
+    # Optimistic concurrency: every balance write must match the version read
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    __table_args__ = (
+        # list_bills, list_unpaid_bills and open-bill searches: filter by
+        # user, order by due date
+        Index("ix_bills_user_id_due_date", user_id, due_date),
+        # Bills list sorted or filtered by amount
+        Index("ix_bills_user_id_amount", user_id, amount),
+        # Duplicate detection when importing bills
+        Index(
+            "ix_bills_biller_id_period_amount",
+            biller_id,
+            period_year,
+            period_month,
+            amount,
+        ),
+    )
 
     biller = relationship("Biller", back_populates="bills")
     payments = relationship(
@@ -119,7 +148,7 @@ class Payment(Base):
     __tablename__ = "payments"
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("user_auth.id"), nullable=False)
-    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False)
+    bill_id = Column(Integer, ForeignKey("bills.id"), nullable=False, index=True)
     amount = Column(Numeric(10, 2), nullable=False)
     paid_on = Column(Date)
     status = Column(String)
@@ -128,6 +157,8 @@ class Payment(Base):
     notes = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (Index("ix_payments_user_id_paid_on", user_id, paid_on),)
+
     bill = relationship("Bill", back_populates="payments")
 
     def __repr__(self):
@@ -149,5 +180,41 @@ class PaymentHistory(Base):
     reference = Column(String)
     transaction_timestamp = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        Index(
+            "ix_payment_history_user_id_transaction_timestamp",
+            user_id,
+            transaction_timestamp,
+        ),
+    )
+
     def __repr__(self):
         return f"<PaymentHistory(id={self.id}, bill_id={self.bill_id}, amount={self.amount})>"
+
+
+# Per-biller totals in integer cents for the month of the bills' due date,
+# maintained by lib.aggregates in the same transaction as every bill and
+# payment write
+class MonthlyTotal(Base):
+    __tablename__ = "monthly_totals"
+    user_id = Column(Integer, ForeignKey("user_auth.id"), primary_key=True)
+    biller_id = Column(Integer, ForeignKey("billers.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    billed = Column(Integer, nullable=False, default=0)
+    paid = Column(Integer, nullable=False, default=0)
+    outstanding = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<MonthlyTotal(biller_id={self.biller_id}, period='{self.year}-{self.month:02d}', billed={self.billed})>"
+
+
+# Per-user data version, bumped after every write so result caches in every
+# app process notice it (see lib.cache)
+class UserDataVersion(Base):
+    __tablename__ = "user_data_versions"
+    user_id = Column(Integer, ForeignKey("user_auth.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<UserDataVersion(user_id={self.user_id}, version={self.version})>"
@@ -0,0 +1,39 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from sqlalchemy import Integer, cast, func
+
+# Money on the read and analytics path is carried as integer cents: the
+# database rounds each Numeric(10, 2) value to cents, sums stay exact
+# integer arithmetic (in SQL or as int64 NumPy columns), and amounts are
+# only turned into text or display units when rendered.
+
+CURRENCY_SYMBOL = "₱"
+CENT = Decimal("0.01")
+
+
+def to_cents(amount) -> int:
+    """Convert a Decimal, str, int or float amount to integer cents."""
+    # str() first so floats from st.number_input keep their shortest repr
+    return int(Decimal(str(amount)).quantize(CENT, rounding=ROUND_HALF_UP) * 100)
+
+
+def from_cents(cents) -> Decimal:
+    """Convert integer cents back to a Decimal amount for the write helpers."""
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def format_money(cents) -> str:
+    """Render integer cents as e.g. '₱1,234.56'."""
+    sign = "-" if cents < 0 else ""
+    units, rest = divmod(abs(int(cents)), 100)
+    return f"{sign}{CURRENCY_SYMBOL}{units:,}.{rest:02d}"
+
+
+def sql_cents(column):
+    """SQL expression converting a Numeric money column to integer cents."""
+    return cast(func.round(column * 100), Integer)
+
+
+def to_units(cents):
+    """Cents to currency units for charts and tables; works on int64 columns."""
+    return cents / 100
@@ -0,0 +1,56 @@
+from datetime import date, datetime
+from typing import NamedTuple, Optional
+
+# Read-only rows returned by the list_* helpers in lib.helpers.
+#
+# The pages only display a handful of columns, so the helpers select just
+# those (the biller name comes from a join) instead of hydrating ORM
+# entities with their relationships. Field order matches the column order
+# of the projection query that builds each row. Money fields hold integer
+# cents (see lib.money).
+
+
+class BillerRow(NamedTuple):
+    id: int
+    name: str
+    biller_type: Optional[str]
+    account: Optional[str]
+    notes: Optional[str]
+
+
+class BillRow(NamedTuple):
+    id: int
+    biller_id: int
+    biller_name: Optional[str]
+    amount_cents: int
+    balance_cents: int  # falls back to the amount when no balance is stored
+    due_date: date
+    period_month: Optional[int]
+    period_year: Optional[int]
+    status: Optional[str]
+    notes: Optional[str]
+
+
+class PaymentRow(NamedTuple):
+    id: int
+    bill_id: int
+    biller_name: Optional[str]
+    amount_cents: int
+    paid_on: Optional[date]
+    status: Optional[str]
+    method: Optional[str]
+    reference: Optional[str]
+
+
+class PaymentHistoryRow(NamedTuple):
+    id: int
+    bill_id: int
+    biller_name: Optional[str]
+    amount_cents: Optional[int]
+    balance_cents: Optional[int]
+    due_date: Optional[date]
+    paid_on: Optional[date]
+    status: Optional[str]
+    method: Optional[str]
+    reference: Optional[str]
+    transaction_timestamp: Optional[datetime]
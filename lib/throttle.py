@@ -0,0 +1,149 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from lib.db import outside_unit_of_work, provide_session
+from lib.models import LoginAttempt
+
+logger = logging.getLogger(__name__)
+
+# Failed logins allowed per username, and attempts allowed per client,
+# within the sliding window
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", "300"))
+LOGIN_MAX_FAILURES_PER_USER = int(os.getenv("LOGIN_MAX_FAILURES_PER_USER", "5"))
+LOGIN_MAX_ATTEMPTS_PER_CLIENT = int(os.getenv("LOGIN_MAX_ATTEMPTS_PER_CLIENT", "20"))
+# login_attempts rows are buffered and inserted in batches
+LOGIN_ATTEMPT_FLUSH_SECONDS = float(os.getenv("LOGIN_ATTEMPT_FLUSH_SECONDS", "5"))
+LOGIN_ATTEMPT_BATCH_SIZE = int(os.getenv("LOGIN_ATTEMPT_BATCH_SIZE", "200"))
+
+
+class SlidingWindowLimiter:
+    """Allow at most `limit` hits per key within the last `window` seconds."""
+
+    def __init__(self, limit, window=LOGIN_WINDOW_SECONDS, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self._clock = clock
+        self._hits = {}
+        self._lock = threading.Lock()
+
+    def allow(self, key):
+        with self._lock:
+            return len(self._prune(key)) < self.limit
+
+    def hit(self, key):
+        with self._lock:
+            self._prune(key).append(self._clock())
+
+    def reset(self, key):
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def sweep(self):
+        """Forget keys whose hits have all left the window."""
+        with self._lock:
+            for key in list(self._hits):
+                if not self._prune(key):
+                    del self._hits[key]
+
+    def _prune(self, key):
+        hits = self._hits.setdefault(key, deque())
+        cutoff = self._clock() - self.window
+        while hits and hits[0] <= cutoff:
+            hits.popleft()
+        return hits
+
+
+class LoginAttemptRecorder:
+    """Buffers login attempts and writes them to login_attempts in batches."""
+
+    def __init__(
+        self,
+        flush_interval=LOGIN_ATTEMPT_FLUSH_SECONDS,
+        batch_size=LOGIN_ATTEMPT_BATCH_SIZE,
+        on_flush=None,
+    ):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.on_flush = on_flush
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def record(self, username, success):
+        with self._lock:
+            self._buffer.append(
+                {
+                    "username": username,
+                    "success": success,
+                    "attempt_time": datetime.now(),
+                }
+            )
+            full = len(self._buffer) >= self.batch_size
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=self._run, name="login-attempt-flusher", daemon=True
+                )
+                self._flusher.start()
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            rows, self._buffer = self._buffer, []
+        if not rows:
+            return 0
+        try:
+            # A full buffer is flushed on the script thread; commit only the
+            # attempts, not the rerun's unit of work
+            with outside_unit_of_work(), provide_session() as db:
+                db.execute(insert(LoginAttempt), rows)
+                db.commit()
+        except Exception as e:
+            logger.error(f"Failed to persist {len(rows)} login attempts: {e}")
+            return 0
+        return len(rows)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            if self.on_flush:
+                self.on_flush()
+
+
+class LoginThrottle:
+    """Per-username and per-client limits, checked before any bcrypt work."""
+
+    def __init__(self, recorder=None):
+        self.users = SlidingWindowLimiter(LOGIN_MAX_FAILURES_PER_USER)
+        self.clients = SlidingWindowLimiter(LOGIN_MAX_ATTEMPTS_PER_CLIENT)
+        self.recorder = recorder or LoginAttemptRecorder(on_flush=self.sweep)
+
+    def allow(self, username, client=None):
+        user_ok = self.users.allow(username.lower())
+        client_ok = client is None or self.clients.allow(client)
+        return user_ok and client_ok
+
+    def record(self, username, success, client=None):
+        if client is not None:
+            self.clients.hit(client)
+        if success:
+            self.users.reset(username.lower())
+        else:
+            self.users.hit(username.lower())
+        self.recorder.record(username, success)
+
+    def sweep(self):
+        self.users.sweep()
+        self.clients.sweep()
+
+
+throttle = LoginThrottle()
+atexit.register(throttle.recorder.flush)
@@ -1,7 +1,11 @@
+import functools
 import logging
 
 import pandas as pd
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from lib.db import current_render, track_render, unit_of_work
 
 # Configure logger for UI helpers
 logger = logging.getLogger(__name__)
@@ -18,19 +22,126 @@ def data_frame_from_models(rows, columns):
     if not rows:
         return pd.DataFrame(columns=columns)
 
-    data = []
-    for r in rows:
-        row_data = {}
-        for col in columns:
-            # Use getattr but allow it to fail strictly or log if needed.
-            # Using default=None is safe for optional fields, but we check existence first
-            # to catch typos in column names during development.
-            if not hasattr(r, col):
-                logger.warning(f"Attribute '{col}' not found in model instance {r}")
-            row_data[col] = getattr(r, col, None)
-        data.append(row_data)
+    # Catch typos in column names during development, once per call
+    missing = [col for col in columns if not hasattr(rows[0], col)]
+    if missing:
+        logger.warning(f"Attributes {missing} not found in model instance {rows[0]}")
+
+    return pd.DataFrame({col: [getattr(r, col, None) for r in rows] for col in columns})
+
+
+def data_frame_from_rows(rows, columns, dtypes=None):
+    """
+    Builds a DataFrame column by column from projected rows (see lib.rows).
+
+    The rows are transposed once and every column becomes a typed Series,
+    instead of building a dict per row and letting pandas infer object
+    columns.
+
+    Args:
+        rows: List of named tuples returned by the list helpers.
+        columns: Mapping of DataFrame column name -> row field name.
+        dtypes: Optional mapping of DataFrame column name -> dtype, e.g.
+            "float64" for money, "datetime64[ns]" for dates or "string".
+    """
+    dtypes = dtypes or {}
+    if not rows:
+        return pd.DataFrame(
+            {name: pd.Series(dtype=dtypes.get(name, object)) for name in columns}
+        )
+
+    fields = rows[0]._fields
+    values = list(zip(*rows))
+    return pd.DataFrame(
+        {
+            name: pd.Series(values[fields.index(field)], dtype=dtypes.get(name))
+            for name, field in columns.items()
+        }
+    )
+
 
-    return pd.DataFrame(data)
+def _is_fragment_rerun():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+
+def fragment(name):
+    """
+    Turns a page section into an st.fragment.
+
+    Widget changes inside the section rerun only that function, with the
+    arguments it was first called with, instead of the whole app. Such
+    partial reruns skip app.main, so the wrapper does its job for them:
+    it shares one unit_of_work() session across the section, tracks its
+    queries with track_render() under `name`, and logs an error instead
+    of showing a traceback. On full reruns the section is simply part of
+    the page render.
+
+    A `prefetched` keyword argument (see lib.helpers.prefetch) is only
+    passed on to the first run; partial reruns load fresh data.
+
+    Args:
+        name: Render name for the section, e.g. "payments.history".
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def section(*args, **kwargs):
+            if _is_fragment_rerun():
+                kwargs.pop("prefetched", None)
+            if current_render() is not None:
+                return func(*args, **kwargs)
+            try:
+                with unit_of_work(), track_render(name) as render:
+                    result = func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Error rendering section {name}: {e}")
+                st.error("An unexpected error occurred in this section.")
+                return None
+            logger.info(f"Rendered {render.name}: {render.summary()}")
+            return result
+
+        return st.fragment(section)
+
+    return decorator
+
+
+def flash(key, message=None):
+    """
+    Shows a success message that survives an st.rerun().
+
+    Call flash(key, message) right before st.rerun() and flash(key) where
+    the message should appear on the next run.
+    """
+    if message is not None:
+        st.session_state[f"{key}_flash"] = message
+    elif f"{key}_flash" in st.session_state:
+        st.success(st.session_state.pop(f"{key}_flash"))
+
+
+def search_select(label, key, search, format_func, placeholder=None):
+    """
+    Renders a type-ahead selector: a search box and a selectbox of matches.
+
+    Only the few rows search() returns for the typed text are fetched and
+    formatted, instead of building an option for every row the user has.
+
+    Args:
+        label: Label of the selectbox, e.g. "Select bill".
+        key: Unique prefix for the widget keys.
+        search: Callable taking the search text, e.g. a partial of
+            search_bills, and returning the matching rows.
+        format_func: Callable turning a row into its option label.
+        placeholder: Optional hint shown in the empty search box.
+
+    Returns (text, row), where row is None when nothing matches.
+    """
+    text = st.text_input("Search", key=f"{key}_search", placeholder=placeholder).strip()
+    rows = search(text)
+    if not rows:
+        return text, None
+    row = st.selectbox(label, rows, format_func=format_func, key=f"{key}_choice")
+    return text, row
 
 
 def two_column_form(left_label, right_label, left_widget, right_widget, ratio=(1, 1)):
@@ -49,3 +160,48 @@ def two_column_form(left_label, right_label, left_widget, right_widget, ratio=(1
         left_widget()
     with col2:
         right_widget()
+
+
+def page_cursor(key):
+    """Returns the cursor of the page paginate(key, ...) is showing."""
+    return st.session_state.get(f"{key}_cursors", [None])[-1]
+
+
+def paginate(key, fetch_page):
+    """
+    Renders Previous/Next controls for a keyset-paginated helper.
+
+    Args:
+        key: Unique prefix for the widget and session state keys.
+        fetch_page: Callable taking a cursor (None for the first page) and
+            returning (rows, next_cursor), e.g. a partial of list_bills_page.
+
+    Returns the rows of the current page. The cursors of the pages visited
+    so far are kept in session state so "Previous" can step back.
+    """
+    cursors = st.session_state.setdefault(f"{key}_cursors", [None])
+    rows, next_cursor = fetch_page(cursors[-1])
+    if not rows and len(cursors) > 1:
+        # The page emptied out (e.g. its rows were deleted), start over
+        cursors[:] = [None]
+        rows, next_cursor = fetch_page(None)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button(
+            "Previous",
+            key=f"{key}_previous",
+            disabled=len(cursors) == 1,
+            on_click=cursors.pop,
+        )
+    with col_page:
+        st.caption(f"Page {len(cursors)}")
+    with col_next:
+        st.button(
+            "Next",
+            key=f"{key}_next",
+            disabled=next_cursor is None,
+            on_click=cursors.append,
+            args=(next_cursor,),
+        )
+    return rows
@@ -1,6 +1,11 @@
+from functools import partial
+
 import streamlit as st
 
-from lib.helpers import list_billers, add_biller, update_biller, delete_biller
+from lib.helpers import list_billers_page, add_biller, update_biller, delete_biller
+from lib.ui import data_frame_from_rows, flash, fragment, page_cursor, paginate
+
+BILLER_TYPES = ["Utility", "Credit Card", "Internet", "Rent", "Insurance", "Other"]
 
 
 def show(user_id):
@@ -9,81 +14,114 @@ def show(user_id):
     tab_list, tab_new = st.tabs(["Registered Billers", "Add New Biller"])
 
     with tab_new:
-        with st.form("add_biller_form", clear_on_submit=True):
-            st.subheader("Add New Biller")
-            name = st.text_input("Biller Name (e.g. Meralco, PLDT)")
-            b_type = st.selectbox(
-                "Type",
-                ["Utility", "Credit Card", "Internet", "Rent", "Insurance", "Other"],
-            )
-            account = st.text_input("Account / Policy Number")
-            notes = st.text_area("Notes")
-
-            submitted = st.form_submit_button("Save Biller")
-
-            if submitted:
-                if not name:
-                    st.error("Biller name is required")
-                else:
-                    try:
-                        add_biller(user_id, name, b_type, account, notes)
-                        st.success(f"Biller '{name}' added successfully!")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error adding biller: {e}")
+        add_biller_form(user_id)
 
     with tab_list:
-        billers = list_billers(user_id)
-        if not billers:
-            st.info("No billers found.")
-        else:
-            for b in billers:
-                with st.expander(f"{b.name} ({b.biller_type})"):
-                    with st.form(f"edit_biller_{b.id}"):
-                        e_name = st.text_input("Name", value=b.name)
-                        e_type = st.selectbox(
-                            "Type",
-                            [
-                                "Utility",
-                                "Credit Card",
-                                "Internet",
-                                "Rent",
-                                "Insurance",
-                                "Other",
-                            ],
-                            index=(
-                                [
-                                    "Utility",
-                                    "Credit Card",
-                                    "Internet",
-                                    "Rent",
-                                    "Insurance",
-                                    "Other",
-                                ].index(b.biller_type)
-                                if b.biller_type
-                                in [
-                                    "Utility",
-                                    "Credit Card",
-                                    "Internet",
-                                    "Rent",
-                                    "Insurance",
-                                    "Other",
-                                ]
-                                else 5
-                            ),
-                        )
-                        e_account = st.text_input("Account", value=b.account or "")
-                        e_notes = st.text_area("Notes", value=b.notes or "")
-
-                        c1, c2 = st.columns([1, 4])
-                        with c1:
-                            if st.form_submit_button("Delete", type="primary"):
-                                delete_biller(user_id, b.id)
-                                st.rerun()
-                        with c2:
-                            if st.form_submit_button("Update"):
-                                update_biller(
-                                    user_id, b.id, e_name, e_type, e_account, e_notes
-                                )
-                                st.success("Updated!")
-                                st.rerun()
+        biller_list(user_id)
+
+
+@fragment("billers.add")
+def add_biller_form(user_id):
+    # Saving reruns the whole page so the list shows the new biller
+    flash("billers.add")
+    with st.form("add_biller_form", clear_on_submit=True):
+        st.subheader("Add New Biller")
+        name = st.text_input("Biller Name (e.g. Meralco, PLDT)")
+        b_type = st.selectbox("Type", BILLER_TYPES)
+        account = st.text_input("Account / Policy Number")
+        notes = st.text_area("Notes")
+
+        submitted = st.form_submit_button("Save Biller")
+
+        if submitted:
+            if not name:
+                st.error("Biller name is required")
+            else:
+                try:
+                    add_biller(user_id, name, b_type, account, notes)
+                    flash("billers.add", f"Biller '{name}' added successfully!")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error adding biller: {e}")
+
+
+def reset_biller_list():
+    # A new search starts over from the first page
+    st.session_state.pop("billers_page_cursors", None)
+
+
+@fragment("billers.list")
+def biller_list(user_id):
+    # Selecting a biller or paging reruns only this section. Only one edit
+    # form is built, for the selected biller, however many billers exist.
+    flash("billers.list")
+
+    search = st.text_input(
+        "Search billers",
+        placeholder="Name starts with...",
+        key="billers_search",
+        on_change=reset_biller_list,
+    ).strip()
+    billers = paginate(
+        "billers_page", partial(list_billers_page, user_id, search=search)
+    )
+    if not billers:
+        st.info("No billers match your search." if search else "No billers found.")
+        return
+
+    # Each search and page keeps its own selection, so a selected row never
+    # points at a different biller after paging
+    table_key = f"billers_table:{search}:{page_cursor('billers_page')}"
+    df = data_frame_from_rows(
+        billers,
+        {"Name": "name", "Type": "biller_type", "Account": "account"},
+    )
+    event = st.dataframe(
+        df,
+        use_container_width=True,
+        hide_index=True,
+        on_select="rerun",
+        selection_mode="single-row",
+        key=table_key,
+    )
+    selected = event.selection.rows
+    if not selected or selected[0] >= len(billers):
+        st.caption("Select a biller in the table to edit or delete it.")
+        return
+    b = billers[selected[0]]
+
+    with st.form(f"edit_biller_{b.id}"):
+        st.subheader(f"Edit {b.name}")
+        e_name = st.text_input("Name", value=b.name)
+        e_type = st.selectbox(
+            "Type",
+            BILLER_TYPES,
+            index=(
+                BILLER_TYPES.index(b.biller_type)
+                if b.biller_type in BILLER_TYPES
+                else BILLER_TYPES.index("Other")
+            ),
+        )
+        e_account = st.text_input("Account", value=b.account or "")
+        e_notes = st.text_area("Notes", value=b.notes or "")
+
+        c1, c2 = st.columns([1, 4])
+        with c1:
+            if st.form_submit_button("Delete", type="primary"):
+                try:
+                    delete_biller(user_id, b.id)
+                    st.session_state.pop(table_key, None)
+                    flash("billers.list", "Biller deleted.")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error deleting biller: {e}")
+        with c2:
+            if st.form_submit_button("Update"):
+                try:
+                    update_biller(user_id, b.id, e_name, e_type, e_account, e_notes)
+                    # A renamed biller may move, so the selection would go stale
+                    st.session_state.pop(table_key, None)
+                    flash("billers.list", "Updated!")
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"Error updating biller: {e}")
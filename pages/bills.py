@@ -1,250 +1,427 @@
 import datetime
+from functools import partial
 
 import streamlit as st
 
-from lib.helpers import list_billers, add_bill, list_bills, update_bill, delete_bill
+from lib.filters import BILL_SORTS, OPEN_STATUS, BillFilter
+from lib.helpers import (
+    list_billers,
+    add_bill,
+    list_bills_page,
+    prefetch,
+    prefetched_call,
+    search_bills,
+    update_bill,
+    delete_bill,
+)
+from lib.money import format_money, to_cents, to_units
+from lib.ui import (
+    data_frame_from_rows,
+    flash,
+    fragment,
+    page_cursor,
+    paginate,
+    search_select,
+)
+
+MONTHS = [
+    "January",
+    "February",
+    "March",
+    "April",
+    "May",
+    "June",
+    "July",
+    "August",
+    "September",
+    "October",
+    "November",
+    "December",
+]
+
+
+def period_years():
+    current_year = datetime.date.today().year
+    return [str(y) for y in range(current_year - 2, current_year + 6)]
+
+
+# Status filter choices on the list: label -> BillFilter.status
+STATUS_FILTERS = {
+    "All": None,
+    "Not paid": OPEN_STATUS,
+    "Unpaid": "unpaid",
+    "Partial": "partial",
+    "Paid": "paid",
+}
+
+
+def bill_label(b):
+    return (
+        f"{b.biller_name or 'Unknown'} ({format_money(b.amount_cents)}) "
+        f"- Due {b.due_date}"
+    )
+
+
+def current_bill_filter():
+    """The BillFilter chosen with the list's filter controls."""
+    state = st.session_state
+    due = state.get("bills_filter_due") or ()
+    month = state.get("bills_filter_month", "Any")
+    year = state.get("bills_filter_year", "Any")
+    min_amount = state.get("bills_filter_min_amount")
+    max_amount = state.get("bills_filter_max_amount")
+    return BillFilter(
+        status=STATUS_FILTERS[state.get("bills_filter_status", "All")],
+        biller_id=state.get("bills_filter_biller"),
+        due_from=due[0] if len(due) > 0 else None,
+        due_to=due[1] if len(due) > 1 else None,
+        period_month=MONTHS.index(month) + 1 if month != "Any" else None,
+        period_year=int(year) if year != "Any" else None,
+        min_amount_cents=to_cents(min_amount) if min_amount is not None else None,
+        max_amount_cents=to_cents(max_amount) if max_amount is not None else None,
+        sort=state.get("bills_filter_sort", "due_date"),
+    )
+
+
+def reset_bills_page():
+    # Other filters or another sort order start over from the first page
+    st.session_state.pop("bills_page_cursors", None)
+
+
+def bill_filter_controls(billers):
+    reset = {"on_change": reset_bills_page}
+    biller_names = {b.id: b.name for b in billers}
+    with st.expander("Filter and sort"):
+        c1, c2, c3 = st.columns(3)
+        c1.selectbox("Status", list(STATUS_FILTERS), key="bills_filter_status", **reset)
+        c2.selectbox(
+            "Biller",
+            [None, *biller_names],
+            format_func=lambda b_id: "All" if b_id is None else biller_names[b_id],
+            key="bills_filter_biller",
+            **reset,
+        )
+        c3.selectbox(
+            "Sort by",
+            list(BILL_SORTS),
+            format_func=lambda key: BILL_SORTS[key][0],
+            key="bills_filter_sort",
+            **reset,
+        )
+
+        c1, c2, c3 = st.columns(3)
+        c1.date_input("Due between", value=[], key="bills_filter_due", **reset)
+        c2.selectbox(
+            "Period Month", ["Any", *MONTHS], key="bills_filter_month", **reset
+        )
+        c3.selectbox(
+            "Period Year", ["Any", *period_years()], key="bills_filter_year", **reset
+        )
+
+        c1, c2 = st.columns(2)
+        amount = {"min_value": 0.0, "step": 0.01, "format": "%.2f", "value": None}
+        c1.number_input(
+            "Minimum amount", key="bills_filter_min_amount", **amount, **reset
+        )
+        c2.number_input(
+            "Maximum amount", key="bills_filter_max_amount", **amount, **reset
+        )
 
 
 def show(user_id):
     st.header("Bills")
 
-    # Common resources
-    months = [
-        "January",
-        "February",
-        "March",
-        "April",
-        "May",
-        "June",
-        "July",
-        "August",
-        "September",
-        "October",
-        "November",
-        "December",
-    ]
-    current_year = datetime.date.today().year
-    years = [str(y) for y in range(current_year - 2, current_year + 6)]
-
-    # 1. Fetch billers for the dropdown
-    billers = list_billers(user_id)
+    # Load the billers, the current page of bills and the bills matching the
+    # manage search in parallel and hand them to the sections below
+    prefetched = prefetch(
+        partial(list_billers, user_id),
+        partial(
+            list_bills_page,
+            user_id,
+            page_cursor("bills_page"),
+            bill_filter=current_bill_filter(),
+        ),
+        partial(
+            search_bills,
+            user_id,
+            st.session_state.get("manage_bill_search", "").strip(),
+        ),
+    )
 
     tab_view, tab_add, tab_manage = st.tabs(["View List", "Add New", "Manage"])
 
     with tab_add:
-        if not billers:
-            st.warning(
-                "No billers found. Please go to the 'Billers' page and add one first."
-            )
-        else:
-            # Create a dictionary for mapping name -> id
-            biller_options = {b.name: b.id for b in billers}
-
-            with st.form("add_bill_form", clear_on_submit=True):
-                st.subheader("Add New Bill")
-
-                selected_biller_name = st.selectbox(
-                    "Biller", list(biller_options.keys())
-                )
-                amount = st.number_input(
-                    "Amount", min_value=0.0, step=0.01, format="%.2f"
-                )
-                due_date = st.date_input("Due Date", datetime.date.today())
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    # Default to current month
-                    current_month_idx = datetime.date.today().month - 1
-                    selected_month = st.selectbox(
-                        "Period Month", months, index=current_month_idx
-                    )
-
-                with col2:
-                    # Default to current year (index 2 in the list starting from current-2)
-                    selected_year = st.selectbox("Period Year", years, index=2)
-
-                notes = st.text_area("Notes")
-
-                submitted = st.form_submit_button("Save Bill")
-
-                if submitted:
-                    if amount <= 0:
-                        st.error("Amount must be greater than 0.")
-                    else:
-                        biller_id = biller_options[selected_biller_name]
-                        try:
-                            period_month = months.index(selected_month) + 1
-                            add_bill(
-                                user_id,
-                                biller_id,
-                                amount,
-                                due_date,
-                                period_month,
-                                int(selected_year),
-                                notes,
-                            )
-                            st.success("Bill added successfully!")
-                            st.rerun()
-                        except Exception as e:
-                            st.error(f"Error adding bill: {e}")
+        add_bill_form(user_id, prefetched=prefetched)
 
     with tab_view:
-        st.subheader("Existing Bills")
-        bills_data = list_bills(user_id)
+        bill_list(user_id, prefetched=prefetched)
 
-        if not bills_data:
-            st.info("No bills recorded yet.")
+    with tab_manage:
+        manage_bills(user_id, prefetched=prefetched)
+
+
+@fragment("bills.list")
+def bill_list(user_id, prefetched=None):
+    # Filtering and paging rerun only the list; the database does both, so
+    # only the rows of the current page are transferred and rendered
+    st.subheader("Existing Bills")
+
+    bill_filter_controls(prefetched_call(prefetched, list_billers, user_id))
+    bill_filter = current_bill_filter()
+    bills_data = paginate(
+        "bills_page",
+        partial(
+            prefetched_call,
+            prefetched,
+            list_bills_page,
+            user_id,
+            bill_filter=bill_filter,
+        ),
+    )
+
+    if not bills_data:
+        if bill_filter._replace(sort="due_date") != BillFilter():
+            st.info("No bills match these filters.")
         else:
-            # Flatten data for display
-            display_data = []
-            for b in bills_data:
-                period_display = ""
-                if b.period_month and b.period_year and 1 <= b.period_month <= 12:
-                    period_display = f"{months[b.period_month - 1]} {b.period_year}"
-
-                display_data.append(
-                    {
-                        "ID": b.id,
-                        "Biller": b.biller.name if b.biller else "Unknown",
-                        "Amount": float(b.amount),
-                        "Due Date": b.due_date,
-                        "Status": b.status,
-                        "Period": period_display,
-                    }
+            st.info("No bills recorded yet.")
+    else:
+        df = data_frame_from_rows(
+            bills_data,
+            {
+                "ID": "id",
+                "Biller": "biller_name",
+                "Amount": "amount_cents",
+                "Due Date": "due_date",
+                "Status": "status",
+            },
+            dtypes={"Amount": "int64", "Due Date": "datetime64[ns]"},
+        )
+        df["Amount"] = to_units(df["Amount"])
+        df["Biller"] = df["Biller"].fillna("Unknown")
+        df["Period"] = [
+            (
+                f"{MONTHS[b.period_month - 1]} {b.period_year}"
+                if b.period_month and b.period_year and 1 <= b.period_month <= 12
+                else ""
+            )
+            for b in bills_data
+        ]
+
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Amount": st.column_config.NumberColumn(format="₱%.2f"),
+                "Due Date": st.column_config.DateColumn(format="MMM DD, YYYY"),
+            },
+        )
+
+
+@fragment("bills.add")
+def add_bill_form(user_id, prefetched=None):
+    # Submits rerun only this section; a saved bill reruns the whole page so
+    # the list picks it up
+    flash("bills.add")
+    billers = prefetched_call(prefetched, list_billers, user_id)
+    years = period_years()
+
+    if not billers:
+        st.warning(
+            "No billers found. Please go to the 'Billers' page and add one first."
+        )
+    else:
+        # Create a dictionary for mapping name -> id
+        biller_options = {b.name: b.id for b in billers}
+
+        with st.form("add_bill_form", clear_on_submit=True):
+            st.subheader("Add New Bill")
+
+            selected_biller_name = st.selectbox("Biller", list(biller_options.keys()))
+            amount = st.number_input("Amount", min_value=0.0, step=0.01, format="%.2f")
+            due_date = st.date_input("Due Date", datetime.date.today())
+
+            col1, col2 = st.columns(2)
+            with col1:
+                # Default to current month
+                current_month_idx = datetime.date.today().month - 1
+                selected_month = st.selectbox(
+                    "Period Month", MONTHS, index=current_month_idx
                 )
 
-            st.dataframe(display_data, use_container_width=True, hide_index=True)
+            with col2:
+                # Default to current year (index 2 in the list starting from current-2)
+                selected_year = st.selectbox("Period Year", years, index=2)
 
-    with tab_manage:
-        st.subheader("Edit or Delete Bill")
+            notes = st.text_area("Notes")
 
-        # Fetch fresh data for management
-        bills_data_manage = list_bills(user_id)
+            submitted = st.form_submit_button("Save Bill")
 
-        if not bills_data_manage:
-            st.info("No bills to manage.")
-        elif not billers:
-            st.info("No billers available to assign.")
-        else:
-            # Create a dictionary for selecting a bill
-            bill_map = {
-                f"{b.biller.name if b.biller else 'Unknown'} (₱{b.amount:,.2f}) - Due {b.due_date}": b
-                for b in bills_data_manage
-            }
-
-            selected_label = st.selectbox("Select Bill", options=list(bill_map.keys()))
-            selected_bill = bill_map[selected_label]
-
-            st.divider()
+            if submitted:
+                if amount <= 0:
+                    st.error("Amount must be greater than 0.")
+                else:
+                    biller_id = biller_options[selected_biller_name]
+                    try:
+                        period_month = MONTHS.index(selected_month) + 1
+                        add_bill(
+                            user_id,
+                            biller_id,
+                            amount,
+                            due_date,
+                            period_month,
+                            int(selected_year),
+                            notes,
+                        )
+                        flash("bills.add", "Bill added successfully!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error adding bill: {e}")
+
+
+@fragment("bills.manage")
+def manage_bills(user_id, prefetched=None):
+    # Picking another bill rebuilds just the edit form, not the whole page
+    st.subheader("Edit or Delete Bill")
+    flash("bills.manage")
+
+    # Only the few bills matching the search are fetched and formatted
+    query, selected_bill = search_select(
+        "Select Bill",
+        "manage_bill",
+        partial(prefetched_call, prefetched, search_bills, user_id),
+        bill_label,
+        placeholder="Biller name or due date, e.g. 2026-03",
+    )
+    billers = prefetched_call(prefetched, list_billers, user_id)
+    current_year = datetime.date.today().year
+    years = period_years()
+
+    if selected_bill is None:
+        st.info("No bills match your search." if query else "No bills to manage.")
+    elif not billers:
+        st.info("No billers available to assign.")
+    else:
+        st.divider()
+
+        biller_options_manage = {b.name: b.id for b in billers}
+
+        # Keyed by bill, so picking another bill pre-fills its own values
+        with st.form(f"edit_bill_form_{selected_bill.id}"):
+            # Pre-fill values
+            current_biller_name = selected_bill.biller_name
+            if current_biller_name and current_biller_name in biller_options_manage:
+                b_idx = list(biller_options_manage.keys()).index(current_biller_name)
+            else:
+                b_idx = 0
+
+            new_biller_name = st.selectbox(
+                "Biller",
+                list(biller_options_manage.keys()),
+                index=b_idx,
+                key=f"edit_biller_{selected_bill.id}",
+            )
 
-            biller_options_manage = {b.name: b.id for b in billers}
+            new_amount = st.number_input(
+                "Amount",
+                min_value=0.0,
+                step=0.01,
+                format="%.2f",
+                value=to_units(selected_bill.amount_cents),
+                key=f"edit_amount_{selected_bill.id}",
+            )
+            new_due_date = st.date_input(
+                "Due Date",
+                value=selected_bill.due_date,
+                key=f"edit_due_date_{selected_bill.id}",
+            )
 
-            with st.form("edit_bill_form"):
-                # Pre-fill values
-                current_biller_name = (
-                    selected_bill.biller.name if selected_bill.biller else None
-                )
-                if current_biller_name and current_biller_name in biller_options_manage:
-                    b_idx = list(biller_options_manage.keys()).index(
-                        current_biller_name
+            c1, c2 = st.columns(2)
+            with c1:
+                # Month
+                m_idx = (
+                    (selected_bill.period_month - 1)
+                    if (
+                        selected_bill.period_month
+                        and 1 <= selected_bill.period_month <= 12
                     )
-                else:
-                    b_idx = 0
-
-                new_biller_name = st.selectbox(
-                    "Biller",
-                    list(biller_options_manage.keys()),
-                    index=b_idx,
-                    key="edit_biller",
+                    else 0
                 )
-
-                new_amount = st.number_input(
-                    "Amount",
-                    min_value=0.0,
-                    step=0.01,
-                    format="%.2f",
-                    value=float(selected_bill.amount),
-                    key="edit_amount",
+                new_month = st.selectbox(
+                    "Period Month",
+                    MONTHS,
+                    index=m_idx,
+                    key=f"edit_month_{selected_bill.id}",
                 )
-                new_due_date = st.date_input(
-                    "Due Date", value=selected_bill.due_date, key="edit_due_date"
+            with c2:
+                # Year
+                y_str = (
+                    str(selected_bill.period_year)
+                    if selected_bill.period_year
+                    else str(current_year)
                 )
-
-                c1, c2 = st.columns(2)
-                with c1:
-                    # Month
-                    m_idx = (
-                        (selected_bill.period_month - 1)
-                        if (
-                            selected_bill.period_month
-                            and 1 <= selected_bill.period_month <= 12
-                        )
-                        else 0
-                    )
-                    new_month = st.selectbox(
-                        "Period Month", months, index=m_idx, key="edit_month"
-                    )
-                with c2:
-                    # Year
-                    y_str = (
-                        str(selected_bill.period_year)
-                        if selected_bill.period_year
-                        else str(current_year)
-                    )
-                    try:
-                        y_idx = years.index(y_str)
-                    except ValueError:
-                        y_idx = 2  # default
-                    new_year = st.selectbox(
-                        "Period Year", years, index=y_idx, key="edit_year"
-                    )
-
-                status_options = ["unpaid", "partial", "paid"]
                 try:
-                    s_idx = status_options.index(selected_bill.status)
+                    y_idx = years.index(y_str)
                 except ValueError:
-                    s_idx = 0
-                new_status = st.selectbox(
-                    "Status", status_options, index=s_idx, key="edit_status"
+                    y_idx = 2  # default
+                new_year = st.selectbox(
+                    "Period Year",
+                    years,
+                    index=y_idx,
+                    key=f"edit_year_{selected_bill.id}",
                 )
 
-                new_notes = st.text_area(
-                    "Notes", value=selected_bill.notes or "", key="edit_notes"
-                )
+            status_options = ["unpaid", "partial", "paid"]
+            try:
+                s_idx = status_options.index(selected_bill.status)
+            except ValueError:
+                s_idx = 0
+            new_status = st.selectbox(
+                "Status",
+                status_options,
+                index=s_idx,
+                key=f"edit_status_{selected_bill.id}",
+            )
 
-                update_submitted = st.form_submit_button("Update Bill")
+            new_notes = st.text_area(
+                "Notes",
+                value=selected_bill.notes or "",
+                key=f"edit_notes_{selected_bill.id}",
+            )
 
-                if update_submitted:
-                    biller_id_val = biller_options_manage[new_biller_name]
-                    p_month = months.index(new_month) + 1
-                    p_year = int(new_year)
+            update_submitted = st.form_submit_button("Update Bill")
+
+            if update_submitted:
+                biller_id_val = biller_options_manage[new_biller_name]
+                p_month = MONTHS.index(new_month) + 1
+                p_year = int(new_year)
 
-                    try:
-                        update_bill(
-                            user_id,
-                            selected_bill.id,
-                            biller_id_val,
-                            new_amount,
-                            new_due_date,
-                            p_month,
-                            p_year,
-                            new_notes,
-                            new_status,
-                        )
-                        st.success("Bill updated.")
-                        st.rerun()
-                    except Exception as e:
-                        st.error(f"Error updating bill: {e}")
-
-            st.write("Danger Zone")
-            if st.button(
-                "Delete this Bill",
-                type="primary",
-                help="Deleting this bill will remove associated payments as well.",
-            ):
                 try:
-                    delete_bill(user_id, selected_bill.id)
-                    st.success("Bill deleted.")
+                    update_bill(
+                        user_id,
+                        selected_bill.id,
+                        biller_id_val,
+                        new_amount,
+                        new_due_date,
+                        p_month,
+                        p_year,
+                        new_notes,
+                        new_status,
+                    )
+                    flash("bills.manage", "Bill updated.")
                     st.rerun()
                 except Exception as e:
-                    st.error(f"Error deleting: {e}")
+                    st.error(f"Error updating bill: {e}")
+
+        st.write("Danger Zone")
+        if st.button(
+            "Delete this Bill",
+            type="primary",
+            help="Deleting this bill will remove associated payments as well.",
+        ):
+            try:
+                delete_bill(user_id, selected_bill.id)
+                flash("bills.manage", "Bill deleted.")
+                st.rerun()
+            except Exception as e:
+                st.error(f"Error deleting: {e}")
@@ -0,0 +1,67 @@
+import os
+
+import streamlit as st
+
+from lib.helpers import import_bills
+from lib.importer import CSV_COLUMNS, PARSERS, text_stream
+from lib.ui import fragment
+
+
+def show(user_id):
+    st.header("Import Bills")
+
+    st.write(
+        "Upload a CSV export or an OFX/QFX bank statement to add many bills at once. "
+        "Billers that do not exist yet are created, and bills already recorded for "
+        "the same biller, period and amount are skipped."
+    )
+    with st.expander("CSV format"):
+        st.write(
+            "The first row must be a header. Required columns: "
+            "`biller`, `amount`, `due_date` (YYYY-MM-DD or MM/DD/YYYY). "
+            "Optional: `period_month`, `period_year`, `biller_type`, `notes`."
+        )
+        st.caption(
+            "Accepted header aliases: "
+            + "; ".join(
+                f"{field}: {', '.join(aliases)}"
+                for field, aliases in CSV_COLUMNS.items()
+            )
+        )
+
+    import_form(user_id)
+
+
+@fragment("imports.form")
+def import_form(user_id):
+    # Uploading and importing reruns only the form, not the page text above
+    with st.form("import_bills_form", clear_on_submit=True):
+        uploaded = st.file_uploader("Statement file", type=sorted(PARSERS))
+        submitted = st.form_submit_button("Import")
+
+        if submitted:
+            if uploaded is None:
+                st.error("Please choose a file to import.")
+                return
+
+            fmt = os.path.splitext(uploaded.name)[1].lstrip(".").lower()
+            try:
+                with st.spinner("Importing bills..."):
+                    summary = import_bills(user_id, PARSERS[fmt](text_stream(uploaded)))
+            except Exception as e:
+                st.error(f"Error importing bills: {e}")
+                return
+
+            st.success(
+                f"Imported {summary['imported']} bills "
+                f"({summary['duplicates']} duplicates skipped, "
+                f"{summary['billers_created']} billers created)."
+            )
+            if summary["credits_skipped"]:
+                st.info(
+                    f"{summary['credits_skipped']} deposits and other credits "
+                    "were skipped."
+                )
+            if summary["invalid"]:
+                st.warning(f"{summary['invalid']} rows could not be read:")
+                st.code("\n".join(summary["errors"]))
@@ -1,46 +1,76 @@
 from datetime import date
-from decimal import Decimal
+from functools import partial
 
-import pandas as pd
 import streamlit as st
 
-from lib.helpers import add_payment, list_payment_history, list_unpaid_bills
+from lib.filters import OPEN_STATUS
+from lib.helpers import (
+    add_payment,
+    list_payment_history_page,
+    prefetch,
+    prefetched_call,
+    search_bills,
+)
+from lib.money import format_money, from_cents, to_cents, to_units
+from lib.ui import (
+    data_frame_from_rows,
+    flash,
+    fragment,
+    page_cursor,
+    paginate,
+    search_select,
+)
+
+
+def bill_label(b):
+    return (
+        f"{b.biller_name or 'Unknown'} - Due {b.due_date} "
+        f"(Total: {format_money(b.amount_cents)} | "
+        f"Bal: {format_money(b.balance_cents)}) - {b.status.upper()}"
+    )
 
 
 def show(user_id):
     st.header("Payments")
 
-    # list_bills now uses eager loading (joinedload) from previous refactoring,
-    # so accessing bill.biller.name here is safe.
-    bills = list_unpaid_bills(user_id)
-
-    if not bills:
-        st.info("No unpaid bills to pay.")
+    # Load both sections' data in parallel and hand it to them; partial
+    # reruns of a section load only its own data
+    prefetched = prefetch(
+        partial(
+            search_bills,
+            user_id,
+            st.session_state.get("payment_bill_search", "").strip(),
+            status=OPEN_STATUS,
+        ),
+        partial(list_payment_history_page, user_id, page_cursor("payment_history")),
+    )
+    payment_form(user_id, prefetched=prefetched)
+    payment_history(user_id, prefetched=prefetched)
+
+
+@fragment("payments.form")
+def payment_form(user_id, prefetched=None):
+    # Searching, choosing a bill or toggling "Pay Full Amount" reruns only
+    # this section
+    flash("payments")
+    # Only the few bills matching the search are fetched and formatted
+    query, bill = search_select(
+        "Select bill",
+        "payment_bill",
+        partial(prefetched_call, prefetched, search_bills, user_id, status=OPEN_STATUS),
+        bill_label,
+        placeholder="Biller name or due date, e.g. 2026-03",
+    )
+
+    if bill is None:
+        st.info(
+            "No unpaid bills match your search." if query else "No unpaid bills to pay."
+        )
         return
 
-    # Create a descriptive label for the dropdown
-    # Format: ID - Biller - Amount [Status]
-    bmap = {}
-    for b in bills:
-        biller_name = b.biller.name if b.biller else "Unknown"
-        # Show balance if available (it might be None for old records if migration didn't run, default to amount)
-        bal = b.balance_amount if b.balance_amount is not None else b.amount
-        label = f"{biller_name} (Total: ₱{b.amount:,.2f} | Bal: ₱{bal:,.2f}) - {b.status.upper()}"
-        bmap[label] = b.id
-        # Store the balance for this specific bill to use later
-        # The key in bmap is unique enough for this simple UI
-        # We can't easily attach data to the selectbox options directly,
-        # so we'll retrieve the bill object again or store a lookup.
-
-    # Create a lookup for balances
-    balance_map = {
-        b.id: (b.balance_amount if b.balance_amount is not None else b.amount)
-        for b in bills
-    }
-
-    sel = st.selectbox("Select bill", options=list(bmap.keys()))
-    bill_id = bmap[sel]
-    current_balance = balance_map[bill_id]
+    bill_id = bill.id
+    # balance_cents already falls back to the amount for old records
+    current_balance = bill.balance_cents
 
     pay_full = st.checkbox("Pay Full Amount")
 
@@ -52,7 +82,7 @@ def show(user_id):
             min_value=0.0,
             format="%.2f",
             step=0.01,
-            value=float(current_balance) if pay_full else 0.0,
+            value=to_units(current_balance) if pay_full else 0.0,
             disabled=pay_full,
         )
 
@@ -79,62 +109,76 @@ def show(user_id):
         submitted = st.form_submit_button("Save Payment")
 
         if submitted:
-            final_amount = current_balance if pay_full else amount_val
+            # Work in cents so the full balance is paid exactly, without a
+            # float round trip
+            final_cents = current_balance if pay_full else to_cents(amount_val)
 
-            if final_amount <= 0:
+            if final_cents <= 0:
                 st.warning("Amount must be greater than 0")
             else:
                 try:
-                    # Convert float input to Decimal for financial accuracy
                     add_payment(
                         user_id,
                         bill_id,
-                        Decimal(str(final_amount)),
+                        from_cents(final_cents),
                         paid_on,
                         method,
                         ref,
                         notes,
                         status,
                     )
-                    st.success("Payment recorded successfully")
+                    # Rerun the whole page so the history shows the payment
+                    flash("payments", "Payment recorded successfully")
+                    st.rerun()
                 except Exception as e:
                     st.error(f"Error recording payment: {e}")
 
-        st.subheader("Payments history")
-        rows = list_payment_history(user_id)
-
-        if rows:
-            # Transform for display
-            data = []
-            for r in rows:
-                data.append(
-                    {
-                        "ID": r.id,
-                        "Bill ID": r.bill_id,
-                        "Biller": r.biller_name,
-                        "Amount": r.amount,
-                        "Balance": r.balance_amount,
-                        "Due Date": r.due_date,
-                        "Date": r.paid_on,
-                        "Status": r.status,
-                        "Method": r.method,
-                        "Ref": r.reference,
-                    }
-                )
-
-            df = pd.DataFrame(data)
-
-            st.dataframe(
-                df,
-                use_container_width=True,
-                hide_index=True,
-                column_config={
-                    "Amount": st.column_config.NumberColumn(format="₱%.2f"),
-                    "Balance": st.column_config.NumberColumn(format="₱%.2f"),
-                    "Date": st.column_config.DateColumn(format="MMM DD, YYYY"),
-                    "Due Date": st.column_config.DateColumn(format="MMM DD, YYYY"),
-                    "Bill ID": st.column_config.NumberColumn(format="%d"),
-                },
-            )
-        else:
-            st.info("No payments recorded.")
+
+@fragment("payments.history")
+def payment_history(user_id, prefetched=None):
+    st.subheader("Payments history")
+    # Buttons are not allowed inside forms, so the pager lives out here
+    rows = paginate(
+        "payment_history",
+        partial(prefetched_call, prefetched, list_payment_history_page, user_id),
+    )
+
+    if rows:
+        df = data_frame_from_rows(
+            rows,
+            {
+                "ID": "id",
+                "Bill ID": "bill_id",
+                "Biller": "biller_name",
+                "Amount": "amount_cents",
+                "Balance": "balance_cents",
+                "Due Date": "due_date",
+                "Date": "paid_on",
+                "Status": "status",
+                "Method": "method",
+                "Ref": "reference",
+            },
+            dtypes={
+                "Amount": "Int64",
+                "Balance": "Int64",
+                "Due Date": "datetime64[ns]",
+                "Date": "datetime64[ns]",
+            },
+        )
+        df["Amount"] = to_units(df["Amount"])
+        df["Balance"] = to_units(df["Balance"])
+
+        st.dataframe(
+            df,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "Amount": st.column_config.NumberColumn(format="₱%.2f"),
+                "Balance": st.column_config.NumberColumn(format="₱%.2f"),
+                "Date": st.column_config.DateColumn(format="MMM DD, YYYY"),
+                "Due Date": st.column_config.DateColumn(format="MMM DD, YYYY"),
+                "Bill ID": st.column_config.NumberColumn(format="%d"),
+            },
+        )
+    else:
+        st.info("No payments recorded.")
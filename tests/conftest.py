@@ -18,3 +18,30 @@ def patch_st_secrets(mocker):
     when it's not configured in the test environment.
     """
     mocker.patch("streamlit.secrets", new_callable=mocker.PropertyMock, return_value={})
+
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    """Point lib.db at a fresh SQLite file and create the schema."""
+    from lib import db, models  # noqa: F401
+    from lib.cache import user_cache
+
+    user_cache.clear()
+    monkeypatch.setattr(db, "DB_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    db.get_engine.clear()
+    db.get_session_factory.clear()
+    db.init_db()
+    yield db
+    db.get_engine().dispose()
+    db.get_engine.clear()
+    db.get_session_factory.clear()
+
+
+@pytest.fixture(autouse=True)
+def fast_hashing(monkeypatch):
+    """Hash inline with the minimum bcrypt cost to keep tests fast."""
+    from lib import hashing
+
+    monkeypatch.setattr(
+        hashing, "_service", hashing.HashingService(rounds=4, workers=0)
+    )
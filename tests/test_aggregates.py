@@ -0,0 +1,129 @@
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib import aggregates, helpers
+from lib.importer import iter_csv_bills
+from lib.models import MonthlyTotal
+
+
+@pytest.fixture
+def user_id(sqlite_db):
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    return helpers.get_user_by_username_or_email("alice").id
+
+
+def stored_totals(sqlite_db, user_id):
+    with sqlite_db.provide_session() as db:
+        return {
+            (r.biller_id, r.year, r.month): (r.billed, r.paid, r.outstanding)
+            for r in db.query(MonthlyTotal).filter(MonthlyTotal.user_id == user_id)
+        }
+
+
+def test_writes_maintain_monthly_totals(user_id, sqlite_db):
+    """Test that every write path keeps monthly_totals in step."""
+    meralco = helpers.add_biller(user_id, "Meralco").id
+    pldt = helpers.add_biller(user_id, "PLDT").id
+    jan = helpers.add_bill(user_id, meralco, Decimal("100.00"), date(2026, 1, 15))
+    feb = helpers.add_bill(user_id, meralco, Decimal("250.50"), date(2026, 2, 3))
+    helpers.add_bill(user_id, pldt, Decimal("40.00"), date(2026, 1, 20))
+    helpers.add_payment(user_id, jan.id, Decimal("30.00"))
+    helpers.add_payments_bulk(
+        user_id,
+        [
+            {"bill_id": feb.id, "amount": Decimal("250.50")},
+            {"bill_id": jan.id, "amount": Decimal("5.25")},
+        ],
+    )
+
+    assert stored_totals(sqlite_db, user_id) == {
+        (meralco, 2026, 1): (10000, 3525, 6475),
+        (meralco, 2026, 2): (25050, 25050, 0),
+        (pldt, 2026, 1): (4000, 0, 4000),
+    }
+
+    # Moving a bill to another month and biller moves its totals too
+    helpers.update_bill(
+        user_id, jan.id, pldt, Decimal("120.00"), date(2026, 2, 1), status="partial"
+    )
+    helpers.delete_bill(user_id, feb.id)
+    summary = helpers.import_bills(
+        user_id, iter_csv_bills(["biller,amount,due_date", "PLDT,9.99,2026-01-31"])
+    )
+    assert summary["imported"] == 1
+
+    assert stored_totals(sqlite_db, user_id) == {
+        (meralco, 2026, 1): (0, 0, 0),
+        (meralco, 2026, 2): (0, 0, 0),
+        (pldt, 2026, 1): (4999, 0, 4999),
+        (pldt, 2026, 2): (12000, 3525, 8475),
+    }
+    assert aggregates.check_monthly_totals(user_id) == []
+
+    helpers.delete_biller(user_id, pldt)
+    assert all(key[0] == meralco for key in stored_totals(sqlite_db, user_id))
+    assert aggregates.check_monthly_totals() == []
+
+
+def test_dashboard_chart_reads_monthly_totals(user_id, sqlite_db):
+    """Test that the monthly series comes from monthly_totals alone."""
+    biller = helpers.add_biller(user_id, "Meralco").id
+    today = date.today()
+    helpers.add_bill(user_id, biller, Decimal("80.00"), today)
+
+    with sqlite_db.track_render("dashboard.show") as stats:
+        summary = helpers.get_dashboard_summary(user_id)
+
+    assert summary["monthly_cents"] == [(today.strftime("%Y-%m"), 8000)]
+    monthly_query = [q for q in stats.queries if "monthly_totals" in q.statement]
+    assert len(monthly_query) == 1
+    assert "FROM bills" not in monthly_query[0].statement
+
+
+def test_check_and_rebuild(user_id, sqlite_db, capsys):
+    """Test that drift is reported and repaired by the rebuild command."""
+    biller = helpers.add_biller(user_id, "Meralco").id
+    bill = helpers.add_bill(user_id, biller, Decimal("100.00"), date(2026, 3, 1))
+    helpers.add_payment(user_id, bill.id, Decimal("60.00"))
+    with sqlite_db.provide_session() as db:
+        db.query(MonthlyTotal).update({"paid": 0})
+        db.commit()
+
+    assert aggregates.check_monthly_totals(user_id) == [
+        ((user_id, biller, 2026, 3), (10000, 0, 4000), (10000, 6000, 4000))
+    ]
+    assert aggregates.main(["check"]) == 1
+
+    assert aggregates.main(["rebuild", "--user-id", str(user_id)]) == 0
+    assert "Rebuilt 1 monthly totals" in capsys.readouterr().out
+    assert aggregates.check_monthly_totals() == []
+    assert aggregates.main(["check"]) == 0
+
+
+def test_init_db_fills_monthly_totals_for_existing_bills(user_id, sqlite_db):
+    """Test that a database with bills but no totals gets rebuilt ones."""
+    biller = helpers.add_biller(user_id, "Meralco").id
+    bill = helpers.add_bill(user_id, biller, Decimal("100.00"), date(2026, 9, 15))
+    # As if the bills predate the monthly_totals table
+    with sqlite_db.provide_session() as db:
+        db.query(MonthlyTotal).delete()
+        db.commit()
+
+    sqlite_db.init_db()
+    assert stored_totals(sqlite_db, user_id) == {(biller, 2026, 9): (10000, 0, 10000)}
+
+    helpers.add_payment(user_id, bill.id, Decimal("40.00"))
+    helpers.update_bill(user_id, bill.id, biller, Decimal("100.00"), date(2026, 10, 1))
+    totals = stored_totals(sqlite_db, user_id)
+    assert totals[(biller, 2026, 10)] == (10000, 4000, 6000)
+    assert totals[(biller, 2026, 9)] == (0, 0, 0)
+    assert aggregates.check_monthly_totals(user_id) == []
+
+    # A database already using the table is left alone
+    assert aggregates.ensure_monthly_totals() is None
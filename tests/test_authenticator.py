@@ -0,0 +1,57 @@
+import sys
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from functions.authenticator import (
+    get_credentials_for,
+    get_user_credentials,
+    session_credentials,
+)
+from lib import helpers
+
+
+@pytest.fixture
+def users(sqlite_db):
+    for i in range(5):
+        helpers.register_user(f"user{i}", "secret", f"User {i}", f"user{i}@example.com")
+
+
+def test_credentials_are_loaded_for_one_user(users, sqlite_db):
+    """Test that only the requested user is loaded, with a single query."""
+    with sqlite_db.track_render("login") as stats:
+        credentials = get_credentials_for("user3")
+
+    assert stats.query_count == 1
+    assert list(credentials["usernames"]) == ["user3"]
+    user_data = credentials["usernames"]["user3"]
+    assert user_data["name"] == "User 3"
+    assert user_data["email"] == "user3@example.com"
+    assert user_data["password"].startswith("$2")
+
+
+def test_unknown_or_missing_username(users):
+    """Test that unknown users yield no credentials."""
+    assert get_user_credentials("nobody") is None
+    assert get_credentials_for("nobody") == {"usernames": {}}
+    assert get_credentials_for(None) == {"usernames": {}}
+
+
+def test_session_credentials_are_loaded_once_per_login(users, sqlite_db):
+    """Test that authenticated reruns reuse the credentials in session state."""
+    session_state = {"username": "user1"}
+    assert list(session_credentials(session_state)["usernames"]) == ["user1"]
+    assert "credentials" not in session_state
+
+    session_state["authentication_status"] = True
+    credentials = session_credentials(session_state)
+    with sqlite_db.track_render("rerun") as stats:
+        assert session_credentials(session_state) is credentials
+    assert stats.query_count == 0
+
+    # Logout pops them, so the next session loads its own
+    session_state.pop("credentials")
+    session_state["username"] = "user2"
+    assert list(session_credentials(session_state)["usernames"]) == ["user2"]
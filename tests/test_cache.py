@@ -0,0 +1,136 @@
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from sqlalchemy import text
+
+from lib import helpers
+from lib.aggregates import rebuild_monthly_totals
+from lib.cache import UserDataCache, invalidate_user, user_cache
+from lib.models import Biller, UserDataVersion
+
+
+@pytest.fixture
+def user_id(sqlite_db):
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    return helpers.get_user_by_username_or_email("alice").id
+
+
+def test_idle_reads_do_not_touch_the_database(user_id, sqlite_db):
+    """Test that repeated list_* calls are served from the cache."""
+    helpers.add_biller(user_id, "Meralco")
+    assert [b.name for b in helpers.list_billers(user_id)] == ["Meralco"]
+
+    with sqlite_db.track_render("billers.show") as stats:
+        billers = helpers.list_billers(user_id)
+
+    assert stats.query_count == 0
+    assert [b.name for b in billers] == ["Meralco"]
+
+
+def test_writes_invalidate_the_users_entries(user_id):
+    """Test that write helpers bump the version so reads stay fresh."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    assert helpers.list_bills(user_id) == []
+
+    bill = helpers.add_bill(user_id, biller.id, Decimal("100.00"), date.today())
+    assert [b.id for b in helpers.list_bills(user_id)] == [bill.id]
+
+    helpers.add_payment(user_id, bill.id, Decimal("100.00"))
+    assert helpers.list_unpaid_bills(user_id) == []
+    assert len(helpers.list_payment_history(user_id)) == 1
+
+    helpers.delete_biller(user_id, biller.id)
+    assert helpers.list_billers(user_id) == []
+    assert helpers.list_bills(user_id) == []
+
+
+def test_cached_rows_survive_a_rolled_back_rerun(user_id, sqlite_db):
+    """Test that cached objects are detached from the rerun that loaded them."""
+    helpers.add_biller(user_id, "Meralco")
+
+    with sqlite_db.unit_of_work():
+        helpers.list_billers(user_id)
+        with pytest.raises(ValueError):
+            helpers.delete_bill(user_id, 999)
+
+    assert helpers.list_billers(user_id)[0].name == "Meralco"
+    assert user_cache.version(user_id) == 1
+
+
+def test_lru_and_row_budget_eviction():
+    """Test that the cache evicts by entry count and by total rows."""
+    cache = UserDataCache(max_entries=2, max_rows=5)
+    cache.set((1, 0, "a"), [1, 2])
+    cache.set((1, 0, "b"), [3])
+    cache.get((1, 0, "a"))
+    cache.set((1, 0, "c"), [4])
+    assert cache.get((1, 0, "b")) == (None, False)
+    assert cache.get((1, 0, "a")) == ([1, 2], True)
+
+    cache.set((2, 0, "d"), [5, 6, 7, 8])
+    assert len(cache) == 1
+    cache.set((2, 0, "e"), list(range(6)))
+    assert cache.get((2, 0, "e")) == (None, False)
+
+
+def test_stale_version_results_are_not_stored():
+    """Test that a load racing with a write is not cached under the old version."""
+    cache = UserDataCache()
+    key = (1, cache.version(1), "list_bills")
+    cache.observe(1, 1)
+    cache.set(key, ["stale"])
+    assert len(cache) == 0
+
+
+def test_writes_from_other_processes_are_seen_after_the_ttl(
+    user_id, sqlite_db, monkeypatch
+):
+    """Test that the data version is re-read from the database."""
+    monkeypatch.setattr(user_cache, "version_ttl", 3600)
+    helpers.add_biller(user_id, "Meralco")
+    assert [b.name for b in helpers.list_billers(user_id)] == ["Meralco"]
+
+    # Another app process (or the lib.aggregates CLI) writes and bumps the
+    # version in its own session; this process has not seen it yet
+    with sqlite_db.provide_session() as db:
+        db.add(Biller(user_id=user_id, name="PLDT"))
+        db.execute(text("UPDATE user_data_versions SET version = version + 1"))
+        db.commit()
+    assert [b.name for b in helpers.list_billers(user_id)] == ["Meralco"]
+
+    monkeypatch.setattr(user_cache, "version_ttl", 0)
+    assert [b.name for b in helpers.list_billers(user_id)] == ["Meralco", "PLDT"]
+    assert user_cache.version(user_id) == 2
+
+
+def test_rolled_back_writes_keep_the_version(user_id, sqlite_db):
+    """Test that only committed bumps move this process to a new version."""
+    helpers.add_biller(user_id, "Meralco")
+
+    with sqlite_db.provide_session() as db:
+        invalidate_user(db, user_id)
+        db.rollback()
+
+    assert user_cache.version(user_id) == 1
+    with sqlite_db.provide_session() as db:
+        assert db.get(UserDataVersion, user_id).version == 1
+
+
+def test_rebuild_bumps_every_users_version(user_id, sqlite_db):
+    """Test that a rebuild of all monthly totals invalidates every user."""
+    helpers.register_user("bob", "secret", "Bob", "bob@example.com")
+    bob_id = helpers.get_user_by_username_or_email("bob").id
+    helpers.add_biller(user_id, "Meralco")
+
+    rebuild_monthly_totals()
+
+    with sqlite_db.provide_session() as db:
+        versions = {v.user_id: v.version for v in db.query(UserDataVersion)}
+    assert versions == {user_id: 2, bob_id: 1}
+    assert len(user_cache) == 0
@@ -0,0 +1,52 @@
+import io
+import sys
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from functions import captcha
+
+
+@pytest.fixture
+def image():
+    """A stand-in for ImageCaptcha that records what it renders."""
+    image = MagicMock()
+    image.generate.side_effect = lambda text: io.BytesIO(f"png:{text}".encode())
+    return image
+
+
+@pytest.fixture
+def pool(image, monkeypatch):
+    pool = captcha.CaptchaPool(image, size=2)
+    monkeypatch.setattr(captcha, "_pool", pool)
+    return pool
+
+
+def test_pool_hands_out_matching_text_and_bytes(pool):
+    """Test that each challenge's PNG bytes were rendered from its text."""
+    for _ in range(5):
+        text, png = pool.take()
+        assert len(text) == 6
+        assert png == f"png:{text}".encode()
+
+
+def test_image_is_rendered_once_per_challenge(pool, image):
+    """Test that reruns serve the cached bytes of the current challenge."""
+    st = SimpleNamespace(session_state={})
+
+    first = captcha.generate_captcha_image(st, image)
+    for _ in range(3):
+        # The very same bytes object: nothing was rendered again
+        assert captcha.generate_captcha_image(st, image) is first
+
+    text = st.session_state["captcha_text"]
+    assert first == f"png:{text}".encode()
+    assert captcha.validate_captcha(text.lower(), st)
+    assert "captcha_text" not in st.session_state
+
+    second = captcha.generate_captcha_image(st, image)
+    assert second == f"png:{st.session_state['captcha_text']}".encode()
@@ -0,0 +1,50 @@
+import sys
+import threading
+from datetime import date
+from decimal import Decimal
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib import helpers
+from lib.models import Bill, Payment, PaymentHistory
+
+THREADS = 8
+PAYMENTS_PER_THREAD = 10
+
+
+def test_parallel_payments_on_one_bill_keep_the_balance(sqlite_db):
+    """Hammer one bill from many threads; no payment may be lost."""
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_by_username_or_email("alice").id
+    biller = helpers.add_biller(user_id, "Meralco")
+    bill = helpers.add_bill(user_id, biller.id, Decimal("1000.00"), date.today())
+
+    start = threading.Barrier(THREADS)
+    errors = []
+
+    def pay():
+        start.wait()
+        for _ in range(PAYMENTS_PER_THREAD):
+            try:
+                helpers.add_payment(user_id, bill.id, Decimal("1.25"))
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+
+    threads = [threading.Thread(target=pay) for _ in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    posted = THREADS * PAYMENTS_PER_THREAD
+    with sqlite_db.provide_session() as db:
+        stored = db.get(Bill, bill.id)
+        assert stored.balance_amount == Decimal("1000.00") - posted * Decimal("1.25")
+        assert stored.status == "partial"
+        assert stored.version == 1 + posted
+        assert db.query(Payment).count() == posted
+        balances = sorted(h.balance_amount for h in db.query(PaymentHistory))
+        # Every history snapshot saw a distinct balance: no lost updates
+        assert len(set(balances)) == posted
@@ -1,6 +1,4 @@
 import sys
-from decimal import Decimal
-from unittest.mock import MagicMock
 
 import pytest
 from streamlit.testing.v1 import AppTest
@@ -8,87 +6,107 @@ from streamlit.testing.v1 import AppTest
 # Add project root to path
 sys.path.insert(0, ".")
 
+from lib.money import to_cents
+from lib.rows import BillerRow, PaymentRow
 from pages import dashboard
 
+USER_ID = 1
+
+
+def run_dashboard_page(user_id):
+    """AppTest script: from_function only sees this body, so import here."""
+    from pages import dashboard
+
+    dashboard.show(user_id)
+
 
 @pytest.fixture
-def mock_db_calls(mocker):
+def mock_db_calls(mocker, sqlite_db):
     """Fixture to mock all database calls made by the dashboard."""
+    # sqlite_db keeps section sessions off the real database file
     mock_list_billers = mocker.patch("pages.dashboard.list_billers")
-    mock_list_bills = mocker.patch("pages.dashboard.list_bills")
-    mock_list_payments = mocker.patch("pages.dashboard.list_payments")
-    return mock_list_billers, mock_list_bills, mock_list_payments
+    mock_summary = mocker.patch("pages.dashboard.get_dashboard_summary")
+    mock_list_payments = mocker.patch("pages.dashboard.list_payments_page")
+    return mock_list_billers, mock_summary, mock_list_payments
 
 
-def create_mock_bill(id, biller_name, amount, balance, status):
-    """Helper to create a mock Bill object with a nested biller mock."""
-    bill = MagicMock()
-    bill.id = id
-    bill.biller = MagicMock()  # Mock the related biller object
-    bill.biller.name = biller_name
-    bill.amount = Decimal(amount)
-    bill.balance_amount = Decimal(balance)
-    bill.status = status
-    return bill
+def create_summary(billers=0, bills=0, pending=0, outstanding="0.00", by_biller=()):
+    """Helper to build the aggregate dict returned by get_dashboard_summary."""
+    return {
+        "bill_count": bills,
+        "biller_count": billers,
+        "pending_count": pending,
+        "total_outstanding_cents": to_cents(outstanding),
+        "monthly_cents": [],
+        "outstanding_by_biller_cents": [(name, to_cents(v)) for name, v in by_biller],
+    }
 
 
 def test_dashboard_empty_state(mock_db_calls):
     """Test the dashboard when there is no data."""
-    mock_list_billers, mock_list_bills, mock_list_payments = mock_db_calls
+    mock_list_billers, mock_summary, mock_list_payments = mock_db_calls
     mock_list_billers.return_value = []
-    mock_list_bills.return_value = []
-    mock_list_payments.return_value = []
+    mock_summary.return_value = create_summary()
+    mock_list_payments.return_value = ([], None)
 
-    at = AppTest.from_function(dashboard.show).run()
+    at = AppTest.from_function(run_dashboard_page, args=(USER_ID,)).run()
 
+    assert not at.exception
     assert at.header[0].value == "Dashboard"
     assert at.metric[0].value == "0"
     assert at.metric[1].value == "₱0.00"
     assert at.metric[2].value == "0"
-    assert at.info[0].value == "No billers registered."
-    assert at.info[1].value == "No bills to analyze."
-    assert at.info[2].value == "No payments recorded yet."
+    assert [i.value for i in at.info] == [
+        "No bills recorded in the last 6 months.",
+        "No billers registered.",
+        "No bills to analyze.",
+        "No payments recorded yet.",
+    ]
+    mock_summary.assert_called_with(USER_ID, window_days=180)
+    mock_list_payments.assert_called_with(USER_ID, limit=dashboard.RECENT_PAYMENTS)
 
 
 def test_dashboard_with_data(mock_db_calls):
     """Test the dashboard with mock data."""
-    mock_list_billers, mock_list_bills, mock_list_payments = mock_db_calls
+    mock_list_billers, mock_summary, mock_list_payments = mock_db_calls
 
-    mock_biller = MagicMock()
-    mock_biller.name = "Meralco"
-    mock_list_billers.return_value = [mock_biller]
+    mock_list_billers.return_value = [BillerRow(1, "Meralco", None, None, None)]
 
-    mock_bills = [
-        create_mock_bill(1, "Meralco", "1000.00", "1000.00", "unpaid"),
-        create_mock_bill(2, "Converge", "2500.00", "500.50", "partial payment"),
-        create_mock_bill(3, "BPI", "5000.00", "0.00", "paid"),
-    ]
-    mock_list_bills.return_value = mock_bills
+    mock_summary.return_value = create_summary(
+        billers=1,
+        bills=3,
+        pending=2,
+        outstanding="1500.50",
+        by_biller=[("Converge", "500.50"), ("Meralco", "1000.00")],
+    )
 
-    mock_payment = MagicMock()
-    mock_payment.amount = Decimal("2000.00")
-    mock_list_payments.return_value = [mock_payment]
+    mock_summary.return_value["monthly_cents"] = [("2026-01", 150050)]
 
-    at = AppTest.from_function(dashboard.show).run()
+    payment = PaymentRow(1, 1, "Meralco", 200000, None, None, None, None)
+    mock_list_payments.return_value = ([payment], None)
 
+    at = AppTest.from_function(run_dashboard_page, args=(USER_ID,)).run()
+
+    assert not at.exception
     assert at.metric[0].value == "1"
     assert at.metric[1].value == "₱1,500.50"
     assert at.metric[2].value == "2"
-    assert len(at.plotly_chart) == 1
+    assert len(at.get("plotly_chart")) == 1
+    assert not at.info
+    directory, recent = at.dataframe
+    assert list(directory.value["Name"]) == ["Meralco"]
+    assert list(recent.value["Amount"]) == [2000.0]
 
 
 def test_dashboard_all_paid(mock_db_calls):
     """Test the dashboard when all bills are paid."""
-    mock_list_billers, mock_list_bills, mock_list_payments = mock_db_calls
+    mock_list_billers, mock_summary, mock_list_payments = mock_db_calls
 
-    mock_list_billers.return_value = [MagicMock()]
-    mock_bills = [
-        create_mock_bill(1, "Meralco", "1000.00", "0.00", "paid"),
-    ]
-    mock_list_bills.return_value = mock_bills
-    mock_list_payments.return_value = []
+    mock_list_billers.return_value = [BillerRow(1, "Meralco", None, None, None)]
+    mock_summary.return_value = create_summary(billers=1, bills=1)
+    mock_list_payments.return_value = ([], None)
 
-    at = AppTest.from_function(dashboard.show).run()
+    at = AppTest.from_function(run_dashboard_page, args=(USER_ID,)).run()
 
     assert at.metric[1].value == "₱0.00"
     assert at.metric[2].value == "0"
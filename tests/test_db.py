@@ -0,0 +1,203 @@
+import sys
+
+from sqlalchemy import event, inspect, text
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+
+def test_init_db_adds_missing_indexes(sqlite_db):
+    """Test that indexes are created on databases that predate them."""
+    engine = sqlite_db.get_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_bills_user_id_due_date"))
+        conn.execute(text("DROP INDEX ix_payments_bill_id"))
+        conn.execute(
+            text(
+                "CREATE INDEX ix_bills_user_id_unpaid_due_date "
+                "ON bills (user_id, due_date) WHERE status != 'paid'"
+            )
+        )
+
+    sqlite_db.init_db()
+
+    bill_indexes = {i["name"] for i in inspect(engine).get_indexes("bills")}
+    payment_indexes = {i["name"] for i in inspect(engine).get_indexes("payments")}
+    assert {"ix_bills_biller_id", "ix_bills_user_id_due_date"} <= bill_indexes
+    assert "ix_bills_user_id_unpaid_due_date" not in bill_indexes
+    assert {"ix_payments_bill_id", "ix_payments_user_id_paid_on"} <= payment_indexes
+
+
+def test_unpaid_bills_query_uses_an_index(sqlite_db):
+    """Test that the unpaid-bills queries avoid a scan and a temp sort."""
+    from lib import helpers
+    from lib.filters import OPEN_STATUS
+
+    with sqlite_db.track_render("payments.show") as stats:
+        helpers.list_unpaid_bills(1)
+        helpers.search_bills(1, "", status=OPEN_STATUS)
+    statements = [q.statement for q in stats.queries if "FROM bills" in q.statement]
+    assert len(statements) == 2
+
+    with sqlite_db.get_engine().connect() as conn:
+        for statement in statements:
+            plan = conn.exec_driver_sql(
+                f"EXPLAIN QUERY PLAN {statement}", (1,) * statement.count("?")
+            ).fetchall()
+            detail = " ".join(row[-1] for row in plan)
+            assert detail.startswith(
+                "SEARCH bills USING INDEX ix_bills_user_id_due_date (user_id=?)"
+            )
+            assert "TEMP B-TREE" not in detail
+
+
+def test_biller_name_search_uses_the_lower_name_index(sqlite_db):
+    """Test that the expression index is recreated and seeks name prefixes."""
+    engine = sqlite_db.get_engine()
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_billers_user_id_lower_name"))
+
+    sqlite_db.init_db()
+    sqlite_db.init_db()
+
+    with engine.connect() as conn:
+        plan = conn.execute(
+            text(
+                "EXPLAIN QUERY PLAN SELECT id FROM billers WHERE user_id = 1 "
+                "AND lower(name) >= 'me' AND lower(name) < 'mf'"
+            )
+        ).fetchall()
+
+    detail = " ".join(row[-1] for row in plan)
+    assert detail.startswith("SEARCH billers USING INDEX ix_billers_user_id_lower_name")
+
+
+def test_tuned_pragma_profile_is_applied(sqlite_db):
+    """Test that every pooled connection gets the tuned pragma profile."""
+    pragmas = sqlite_db.read_sqlite_pragmas(sqlite_db.get_engine())
+
+    assert pragmas["journal_mode"] == "wal"
+    assert pragmas["synchronous"] == 1  # NORMAL
+    assert pragmas["busy_timeout"] == 5000
+    assert pragmas["cache_size"] == -65536
+    assert pragmas["temp_store"] == 2  # MEMORY
+
+
+def test_pragma_overrides_from_environment(monkeypatch):
+    """Test that individual pragmas can be overridden next to DATABASE_URL."""
+    from lib import db
+
+    monkeypatch.setenv("SQLITE_BUSY_TIMEOUT_MS", "15000")
+    assert db.get_sqlite_pragmas()["busy_timeout"] == "15000"
+
+    monkeypatch.setattr(db, "SQLITE_PRAGMA_PROFILE", "default")
+    assert db.get_sqlite_pragmas() == {"busy_timeout": "15000"}
+
+
+def test_track_render_records_queries(sqlite_db):
+    """Test that queries are grouped per render with latency and row counts."""
+    from lib import helpers
+
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_by_username_or_email("alice").id
+    helpers.add_biller(user_id, "Meralco")
+    helpers.add_biller(user_id, "Converge")
+
+    with sqlite_db.track_render("billers.show") as stats:
+        helpers.list_billers(user_id)
+
+    assert stats.query_count == 1
+    assert stats.queries[0].statement.lstrip().startswith("SELECT")
+    assert stats.queries[0].rowcount == 2
+    assert stats.queries[0].duration_ms >= 0
+    assert sqlite_db.get_render_summaries()["billers.show"]["query_count"] == 1
+
+    # Queries outside a tracked render are not recorded
+    helpers.list_billers(user_id)
+    assert stats.query_count == 1
+
+
+def test_slow_queries_are_logged(sqlite_db, mocker, caplog):
+    """Test that queries above the threshold go to the slow-query log."""
+    from lib import helpers
+
+    mocker.patch.object(sqlite_db, "SLOW_QUERY_MS", 0)
+    with sqlite_db.track_render("dashboard.show"):
+        helpers.list_billers(1)
+
+    slow = [r for r in caplog.records if '"event": "slow_query"' in r.getMessage()]
+    assert slow
+    assert '"render": "dashboard.show"' in slow[0].getMessage()
+
+
+def test_unit_of_work_shares_one_session(sqlite_db):
+    """Test that helpers join the rerun-scoped session and its identity map."""
+    from lib import helpers
+    from lib.models import Biller
+
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_by_username_or_email("alice").id
+    biller_id = helpers.add_biller(user_id, "Meralco").id
+
+    checkouts = []
+    engine = sqlite_db.get_engine()
+    listener = lambda *args: checkouts.append(args)  # noqa: E731
+    event.listen(engine, "checkout", listener)
+    try:
+        with sqlite_db.unit_of_work() as session:
+            with sqlite_db.provide_session() as db:
+                assert db is session
+            biller = session.get(Biller, biller_id)
+            helpers.update_biller(user_id, biller_id, "Meralco Inc.")
+            helpers.update_biller(user_id, biller_id, "Meralco Corp.")
+            assert session.get(Biller, biller_id) is biller
+            assert biller.name == "Meralco Corp."
+    finally:
+        event.remove(engine, "checkout", listener)
+
+    assert len(checkouts) == 1
+
+
+def test_idle_unit_of_work_checks_out_no_connection(sqlite_db):
+    """Test that a rerun served from the cache never touches the pool."""
+    checkouts = []
+    engine = sqlite_db.get_engine()
+    listener = lambda *args: checkouts.append(args)  # noqa: E731
+    event.listen(engine, "checkout", listener)
+    try:
+        with sqlite_db.unit_of_work():
+            pass
+        assert checkouts == []
+        with sqlite_db.unit_of_work() as session:
+            session.execute(text("SELECT 1"))
+            session.commit()
+            session.execute(text("SELECT 1"))
+    finally:
+        event.remove(engine, "checkout", listener)
+
+    assert len(checkouts) == 1
+    assert engine.pool.checkedout() == 0
+
+
+def test_init_db_adds_missing_columns(sqlite_db):
+    """Test that new columns are added to tables that predate them."""
+    from lib import helpers
+
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_by_username_or_email("alice").id
+    biller_id = helpers.add_biller(user_id, "Meralco").id
+    engine = sqlite_db.get_engine()
+    with engine.begin() as conn:
+        conn.execute(text("ALTER TABLE bills DROP COLUMN version"))
+        conn.execute(
+            text(
+                "INSERT INTO bills (user_id, biller_id, amount, due_date) "
+                "VALUES (:u, :b, 10, '2026-01-01')"
+            ),
+            {"u": user_id, "b": biller_id},
+        )
+
+    sqlite_db.init_db()
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version FROM bills")).scalar() == 1
@@ -0,0 +1,47 @@
+import sys
+
+import bcrypt
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib import hashing, helpers
+
+
+def test_hash_and_verify_in_worker_pool():
+    """Test hashing and verification through the process pool."""
+    service = hashing.HashingService(rounds=4, workers=1, max_pending=2)
+    try:
+        hashed = service.hash("secret")
+        assert hashed.startswith("$2b$04$")
+        assert service.verify("secret", hashed)
+        assert not service.verify("wrong", hashed)
+        assert not service.verify("secret", "not-a-bcrypt-hash")
+    finally:
+        service.shutdown()
+
+
+def test_needs_rehash_compares_work_factor():
+    """Test detection of hashes made with another cost."""
+    service = hashing.HashingService(rounds=5, workers=0)
+
+    assert service.needs_rehash(bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode())
+    assert not service.needs_rehash(service.hash("x"))
+    assert service.needs_rehash("garbage")
+
+
+def test_login_rehashes_when_cost_changed(sqlite_db):
+    """Test that a stored hash with an old cost is upgraded transparently."""
+    from functions.authenticator import get_user_credentials
+
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    old = get_user_credentials("alice")
+    assert old["password"].startswith("$2b$04$")
+
+    hashing.get_hashing_service().rounds = 5
+    assert helpers.upgrade_password_hash(old["id"], "secret", old["password"])
+
+    new_hash = get_user_credentials("alice")["password"]
+    assert new_hash.startswith("$2b$05$")
+    assert hashing.verify_password("secret", new_hash)
+    assert not helpers.upgrade_password_hash(old["id"], "secret", new_hash)
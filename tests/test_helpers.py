@@ -0,0 +1,460 @@
+import sys
+import threading
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from functools import partial
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib import helpers
+from lib.filters import OPEN_STATUS, BillFilter
+from lib.rows import BillerRow, BillRow, PaymentHistoryRow, PaymentRow
+
+
+@pytest.fixture
+def user_id(sqlite_db):
+    """Register a user against the temporary database and return its id."""
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    return helpers.get_user_by_username_or_email("alice").id
+
+
+def test_dashboard_summary_empty(user_id):
+    """Test the aggregates for a user without billers or bills."""
+    summary = helpers.get_dashboard_summary(user_id)
+
+    assert summary["bill_count"] == 0
+    assert summary["biller_count"] == 0
+    assert summary["pending_count"] == 0
+    assert summary["total_outstanding_cents"] == 0
+    assert summary["monthly_cents"] == []
+    assert summary["outstanding_by_biller_cents"] == []
+
+
+def test_dashboard_summary_aggregates(user_id):
+    """Test that KPIs and chart series are computed by the database."""
+    today = date.today()
+    meralco = helpers.add_biller(user_id, "Meralco", "Utility")
+    converge = helpers.add_biller(user_id, "Converge", "Internet")
+
+    helpers.add_bill(user_id, meralco.id, Decimal("1000.00"), today)
+    partial = helpers.add_bill(user_id, converge.id, Decimal("2500.00"), today)
+    paid = helpers.add_bill(user_id, converge.id, Decimal("300.00"), today)
+    helpers.add_bill(user_id, meralco.id, Decimal("99.00"), today - timedelta(days=400))
+    helpers.add_payment(user_id, partial.id, Decimal("1999.50"))
+    helpers.add_payment(user_id, paid.id, Decimal("300.00"))
+
+    summary = helpers.get_dashboard_summary(user_id)
+
+    assert summary["bill_count"] == 4
+    assert summary["biller_count"] == 2
+    assert summary["pending_count"] == 3
+    assert summary["total_outstanding_cents"] == 159950
+    assert summary["monthly_cents"] == [(today.strftime("%Y-%m"), 380000)]
+    assert summary["outstanding_by_biller_cents"] == [
+        ("Converge", 50050),
+        ("Meralco", 109900),
+    ]
+
+
+def test_dashboard_summary_window_follows_the_date(user_id, monkeypatch):
+    """Test that a cached summary is not reused on a later day."""
+    meralco = helpers.add_biller(user_id, "Meralco")
+    helpers.add_bill(user_id, meralco.id, Decimal("10.00"), date.today())
+    assert len(helpers.get_dashboard_summary(user_id)["monthly_cents"]) == 1
+
+    class Later(datetime):
+        @classmethod
+        def today(cls):
+            return datetime.now() + timedelta(days=400)
+
+    monkeypatch.setattr(helpers, "datetime", Later)
+    assert helpers.get_dashboard_summary(user_id)["monthly_cents"] == []
+
+
+def test_user_lookup_by_username_or_email(user_id):
+    """Test that the UNION lookup matches either identifier."""
+    helpers.register_user("bob", "secret", "Bob", "bob@example.com")
+
+    assert helpers.get_user_by_username_or_email("alice").id == user_id
+    assert helpers.get_user_by_username_or_email("alice@example.com").id == user_id
+    assert helpers.get_user_by_username_or_email("bob@example.com").username == "bob"
+    assert helpers.get_user_by_username_or_email("carol") is None
+
+
+def test_user_id_by_username(user_id):
+    """Test resolving the session user id from the username."""
+    assert helpers.get_user_id_by_username("alice") == user_id
+    assert helpers.get_user_id_by_username("alice@example.com") is None
+
+
+def test_add_payment_updates_balance_in_place(user_id, sqlite_db):
+    """Test that posting a payment does not load the bill's prior payments."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    bill = helpers.add_bill(user_id, biller.id, Decimal("1000.00"), date.today())
+    for _ in range(5):
+        helpers.add_payment(user_id, bill.id, Decimal("100.00"))
+
+    with sqlite_db.track_render("payments.show") as stats:
+        helpers.add_payment(user_id, bill.id, Decimal("150.00"))
+
+    assert not any("WHERE ? = payments.bill_id" in q.statement for q in stats.queries)
+    assert not any("WHERE payments.bill_id" in q.statement for q in stats.queries)
+    (unpaid,) = helpers.list_unpaid_bills(user_id)
+    assert unpaid.balance_cents == 35000
+    assert unpaid.status == "partial"
+
+    helpers.add_payment(user_id, bill.id, Decimal("350.00"))
+    assert helpers.list_unpaid_bills(user_id) == []
+    history = helpers.list_payment_history(user_id)
+    assert history[0].status == "paid"
+    assert history[0].balance_cents == 0
+
+
+def test_update_bill_recomputes_balance_with_sql_sum(user_id):
+    """Test that editing the amount keeps the balance consistent with payments."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    bill = helpers.add_bill(user_id, biller.id, Decimal("1000.00"), date.today())
+    helpers.add_payment(user_id, bill.id, Decimal("250.00"))
+
+    # The bills page passes the amount as a float from st.number_input
+    helpers.update_bill(user_id, bill.id, biller.id, 1200.0, date.today())
+
+    (updated,) = helpers.list_bills(user_id)
+    assert updated.amount_cents == 120000
+    assert updated.balance_cents == 95000
+
+
+def test_add_payments_bulk(user_id, sqlite_db):
+    """Test posting a large batch with a constant number of statements."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    bills = [
+        helpers.add_bill(user_id, biller.id, Decimal("100.00"), date.today())
+        for _ in range(3)
+    ]
+    batch = [
+        {"bill_id": bills[i % 2].id, "amount": Decimal("0.05"), "method": "GCash"}
+        for i in range(1000)
+    ]
+    batch.append({"bill_id": bills[2].id, "amount": "100.00"})
+
+    with sqlite_db.track_render("import") as stats:
+        assert helpers.add_payments_bulk(user_id, batch) == 1001
+
+    # select, update, two inserts, one monthly_totals upsert and the data
+    # version bump
+    assert stats.query_count == 6
+    unpaid = {b.id: b for b in helpers.list_unpaid_bills(user_id)}
+    assert set(unpaid) == {bills[0].id, bills[1].id}
+    assert unpaid[bills[0].id].balance_cents == 7500
+    assert unpaid[bills[0].id].status == "partial"
+    assert len(helpers.list_payments(user_id)) == 1001
+    assert len(helpers.list_payment_history(user_id)) == 1001
+
+
+def test_add_payments_bulk_rejects_foreign_bills(user_id):
+    """Test that the whole batch fails if any bill belongs to someone else."""
+    helpers.register_user("bob", "secret", "Bob", "bob@example.com")
+    bob_id = helpers.get_user_id_by_username("bob")
+    biller = helpers.add_biller(bob_id, "Meralco")
+    bobs_bill = helpers.add_bill(bob_id, biller.id, Decimal("10.00"), date.today())
+
+    with pytest.raises(ValueError, match="access denied"):
+        helpers.add_payments_bulk(
+            user_id, [{"bill_id": bobs_bill.id, "amount": Decimal("1.00")}]
+        )
+    assert helpers.list_payments(bob_id) == []
+
+
+def _walk_pages(fetch_page):
+    """Follow next cursors until the last page, returning every page."""
+    pages, cursor = [], None
+    while True:
+        rows, cursor = fetch_page(cursor)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+
+def test_list_bills_page_keyset(user_id, sqlite_db):
+    """Test that bill pages follow (due_date, id) without gaps or repeats."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    today = date.today()
+    # Several bills share a due date, so the id has to break the ties
+    for i in range(7):
+        helpers.add_bill(user_id, biller.id, Decimal("10.00"), today + timedelta(i % 3))
+
+    pages = _walk_pages(lambda after: helpers.list_bills_page(user_id, after, limit=3))
+
+    assert [len(rows) for rows in pages] == [3, 3, 1]
+    assert [b.id for rows in pages for b in rows] == [
+        b.id for b in helpers.list_bills(user_id)
+    ]
+    ordered = [(b.due_date, b.id) for rows in pages for b in rows]
+    assert ordered == sorted(ordered)
+
+    with sqlite_db.track_render("bills.show") as stats:
+        helpers.list_bills_page(user_id, (today.isoformat(), pages[0][-1].id), 3)
+    (query,) = stats.queries
+    assert "(bills.due_date, bills.id) > (?, ?)" in query.statement
+
+
+def test_list_billers_page_prefix_search(user_id, sqlite_db):
+    """Test paging billers by name and narrowing them by a name prefix."""
+    for name in ("Meralco", "Maynilad", "Converge", "Meralco", "PLDT", "Me"):
+        helpers.add_biller(user_id, name)
+
+    pages = _walk_pages(
+        lambda after: helpers.list_billers_page(user_id, after, limit=4)
+    )
+    assert [len(rows) for rows in pages] == [4, 2]
+    assert [b.id for rows in pages for b in rows] == [
+        b.id for b in helpers.list_billers(user_id)
+    ]
+
+    pages = _walk_pages(
+        lambda after: helpers.list_billers_page(user_id, after, 2, search="Me")
+    )
+    assert [[b.name for b in rows] for rows in pages] == [
+        ["Me", "Meralco"],
+        ["Meralco"],
+    ]
+    rows, _ = helpers.list_billers_page(user_id, search="mE")
+    assert [b.name for b in rows] == ["Me", "Meralco", "Meralco"]
+
+    with sqlite_db.track_render("billers.show") as stats:
+        helpers.list_billers_page(user_id, search="Con")
+    (query,) = stats.queries
+    assert "lower(billers.name) >= ? AND lower(billers.name) < ?" in query.statement
+
+
+def test_search_bills_by_name_prefix_and_due_date(user_id, sqlite_db):
+    """Test that bills are found by biller name prefix or due date range."""
+    meralco = helpers.add_biller(user_id, "Meralco")
+    maynilad = helpers.add_biller(user_id, "Maynilad")
+    helpers.register_user("bob", "secret", "Bob", "bob@example.com")
+    bob_id = helpers.get_user_by_username_or_email("bob").id
+    stranger = helpers.add_biller(bob_id, "Meralco")
+    helpers.add_bill(bob_id, stranger.id, Decimal("1.00"), date(2026, 3, 2))
+    march = helpers.add_bill(user_id, meralco.id, Decimal("10.00"), date(2026, 3, 2))
+    april = helpers.add_bill(user_id, meralco.id, Decimal("20.00"), date(2026, 4, 1))
+    water = helpers.add_bill(user_id, maynilad.id, Decimal("30.00"), date(2026, 3, 31))
+    helpers.add_payment(user_id, april.id, Decimal("20.00"))
+
+    def ids(*args, **kwargs):
+        return [b.id for b in helpers.search_bills(user_id, *args, **kwargs)]
+
+    assert ids("") == [march.id, water.id, april.id]
+    assert ids("Mer") == [march.id, april.id]
+    assert ids("mer") == [march.id, april.id]
+    assert ids("2026-03") == [march.id, water.id]
+    assert ids("2026-03-31") == [water.id]
+    assert ids("2026", status=OPEN_STATUS) == [march.id, water.id]
+    assert ids("Mer", status="paid") == [april.id]
+    assert ids("", limit=1) == [march.id]
+
+    with sqlite_db.track_render("payments.show") as stats:
+        helpers.search_bills(user_id, "May")
+    (query,) = stats.queries
+    assert "lower(billers.name) >= ? AND lower(billers.name) < ?" in query.statement
+
+
+def test_list_bills_filter_and_sort(user_id, sqlite_db):
+    """Test that a BillFilter narrows and orders the bills in SQL."""
+    meralco = helpers.add_biller(user_id, "Meralco")
+    maynilad = helpers.add_biller(user_id, "Maynilad")
+    bills = [
+        helpers.add_bill(user_id, meralco.id, Decimal(amount), due, month, 2026)
+        for amount, due, month in [
+            ("120.50", date(2026, 1, 10), 1),
+            ("80.00", date(2026, 2, 10), 2),
+            ("120.50", date(2026, 3, 10), 3),
+            ("15.25", date(2026, 2, 20), 2),
+        ]
+    ]
+    water = helpers.add_bill(user_id, maynilad.id, Decimal("99.99"), date(2026, 2, 1))
+    helpers.add_payment(user_id, bills[1].id, Decimal("80.00"))
+
+    def ids(**kwargs):
+        return [b.id for b in helpers.list_bills(user_id, BillFilter(**kwargs))]
+
+    assert ids(biller_id=maynilad.id) == [water.id]
+    assert ids(status=OPEN_STATUS, biller_id=meralco.id, period_month=2) == [
+        bills[3].id
+    ]
+    assert ids(due_from=date(2026, 2, 1), due_to=date(2026, 2, 10)) == [
+        water.id,
+        bills[1].id,
+    ]
+    assert ids(min_amount_cents=8000, max_amount_cents=9999) == [
+        water.id,
+        bills[1].id,
+    ]
+    assert ids(sort="-amount") == [
+        bills[2].id,
+        bills[0].id,
+        water.id,
+        bills[1].id,
+        bills[3].id,
+    ]
+    with pytest.raises(ValueError):
+        helpers.list_bills(user_id, BillFilter(sort="notes"))
+
+    # Keyset pages follow the chosen sort, ties on the amount included
+    for sort in ("amount", "-amount", "-due_date"):
+        pages = _walk_pages(
+            lambda after: helpers.list_bills_page(
+                user_id, after, 2, bill_filter=BillFilter(sort=sort)
+            )
+        )
+        assert [b.id for rows in pages for b in rows] == ids(sort=sort)
+
+    with sqlite_db.track_render("bills.show") as stats:
+        helpers.list_bills_page(user_id, bill_filter=BillFilter(sort="amount"))
+    (query,) = stats.queries
+    assert "ORDER BY bills.amount, bills.id" in query.statement
+
+
+def test_list_payments_page_puts_undated_payments_last(user_id, sqlite_db):
+    """Test paging payments by paid_on desc when some dates are missing."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    bill = helpers.add_bill(user_id, biller.id, Decimal("100.00"), date.today())
+    for days in (0, 5, 5, 9):
+        helpers.add_payment(
+            user_id, bill.id, Decimal("1.00"), date.today() - timedelta(days)
+        )
+    helpers.add_payment(user_id, bill.id, Decimal("1.00"))
+    with sqlite_db.provide_session() as db:
+        db.query(helpers.Payment).filter(helpers.Payment.id > 3).update(
+            {"paid_on": None}
+        )
+        helpers.invalidate_user(db, user_id)
+        db.commit()
+
+    pages = _walk_pages(
+        lambda after: helpers.list_payments_page(user_id, after, limit=2)
+    )
+
+    payments = [p for rows in pages for p in rows]
+    assert [p.id for p in payments] == [1, 3, 2, 5, 4]
+    assert [p.paid_on is None for p in payments] == [False] * 3 + [True] * 2
+
+
+def test_list_payment_history_page_same_timestamp(user_id):
+    """Test that history rows written in the same second are paged once each."""
+    biller = helpers.add_biller(user_id, "Meralco")
+    bill = helpers.add_bill(user_id, biller.id, Decimal("100.00"), date.today())
+    helpers.add_payments_bulk(
+        user_id, [{"bill_id": bill.id, "amount": Decimal("1.00")}] * 5
+    )
+
+    pages = _walk_pages(
+        lambda after: helpers.list_payment_history_page(user_id, after, limit=2)
+    )
+
+    assert [len(rows) for rows in pages] == [2, 2, 1]
+    assert [h.id for rows in pages for h in rows] == [5, 4, 3, 2, 1]
+
+
+def test_list_helpers_return_projected_rows(user_id, sqlite_db):
+    """Test that list helpers select only the displayed columns into rows."""
+    for columns, row_type in [
+        (helpers.BILLER_ROW_COLUMNS, BillerRow),
+        (helpers.BILL_ROW_COLUMNS, BillRow),
+        (helpers.PAYMENT_ROW_COLUMNS, PaymentRow),
+        (helpers.PAYMENT_HISTORY_ROW_COLUMNS, PaymentHistoryRow),
+    ]:
+        assert tuple(c.key for c in columns) == row_type._fields
+
+    biller = helpers.add_biller(user_id, "Meralco")
+    bill = helpers.add_bill(user_id, biller.id, Decimal("100.00"), date.today())
+    helpers.add_payment(user_id, bill.id, Decimal("40.00"), method="GCash")
+
+    with sqlite_db.track_render("bills.show") as stats:
+        (bill_row,) = helpers.list_bills(user_id)
+        (payment_row,) = helpers.list_payments(user_id)
+
+    assert stats.query_count == 2
+    assert "bills.created_at" not in stats.queries[0].statement
+    assert bill_row == BillRow(
+        bill.id,
+        biller.id,
+        "Meralco",
+        10000,
+        6000,
+        date.today(),
+        None,
+        None,
+        "partial",
+        None,
+    )
+    assert payment_row.biller_name == "Meralco"
+    assert payment_row.method == "GCash"
+
+
+def test_fetch_concurrently_runs_reads_in_parallel(user_id, sqlite_db):
+    """Test that independent reads overlap and use their own sessions."""
+    helpers.add_biller(user_id, "Meralco")
+    barrier = threading.Barrier(2, timeout=5)
+    sessions = []
+
+    def read_billers():
+        # Only passes if the other call is running at the same time
+        barrier.wait()
+        with sqlite_db.provide_session() as db:
+            sessions.append(db)
+        return helpers.list_billers(user_id)
+
+    def read_bills():
+        barrier.wait()
+        return helpers.list_bills(user_id)
+
+    with sqlite_db.unit_of_work() as rerun_session:
+        with sqlite_db.track_render("dashboard.show") as stats:
+            billers, bills = helpers.fetch_concurrently(read_billers, read_bills)
+
+    assert [b.name for b in billers] == ["Meralco"]
+    assert bills == []
+    assert sessions and sessions[0] is not rerun_session
+    assert stats.query_count == 2
+
+
+def test_fetch_concurrently_reraises(user_id):
+    """Test that a failing read surfaces in the caller."""
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        helpers.fetch_concurrently(partial(helpers.list_billers, user_id), fail)
+
+
+def test_prefetched_call_reuses_prefetched_results(user_id):
+    """Test that sections get the prefetched result instead of a new query."""
+    helpers.add_biller(user_id, "Meralco")
+    calls = []
+
+    def list_billers(user_id):
+        calls.append(user_id)
+        return helpers.list_billers(user_id)
+
+    prefetched = helpers.prefetch(
+        partial(list_billers, user_id),
+        partial(helpers.search_bills, user_id, "", status="open"),
+    )
+    billers = helpers.prefetched_call(prefetched, list_billers, user_id)
+    assert [b.name for b in billers] == ["Meralco"]
+    assert (
+        helpers.prefetched_call(
+            prefetched, helpers.search_bills, user_id, "", status="open"
+        )
+        == []
+    )
+    assert calls == [user_id]
+
+    # Calls with other arguments, or without prefetched results, run
+    assert helpers.prefetched_call(prefetched, list_billers, user_id + 1) == []
+    assert helpers.prefetched_call(None, list_billers, user_id) == billers
+    assert calls == [user_id, user_id + 1, user_id]
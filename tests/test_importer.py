@@ -0,0 +1,147 @@
+import io
+import sys
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib import helpers
+from lib.importer import (
+    ImportRowError,
+    SkippedCredit,
+    iter_csv_bills,
+    iter_ofx_bills,
+    text_stream,
+)
+
+CSV = """Biller,Amount,Due Date,Notes
+Meralco,"1,500.25",2026-01-31,January
+PLDT,1999.00,02/28/2026,
+Meralco,1500.25,2026-01-15,same period and amount
+Meralco,not-a-number,2026-03-31,
+"""
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260105120000[-8:PST]<TRNAMT>-850.00<NAME>Converge
+<MEMO>Internet</STMTTRN>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20260210
+<TRNAMT>-120.50
+<NAME>Maynilad
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def test_csv_rows_are_parsed_lazily():
+    """Test CSV parsing, period defaults and per-row errors."""
+    rows = list(iter_csv_bills(text_stream(io.BytesIO(CSV.encode()))))
+
+    assert rows[0]["biller"] == "Meralco"
+    assert rows[0]["amount"] == Decimal("1500.25")
+    assert rows[0]["due_date"] == date(2026, 1, 31)
+    assert (rows[0]["period_month"], rows[0]["period_year"]) == (1, 2026)
+    assert rows[0]["notes"] == "January"
+    assert rows[1]["due_date"] == date(2026, 2, 28)
+    assert isinstance(rows[3], ImportRowError)
+    assert rows[3].line == 5
+
+
+def test_csv_rejects_unusable_amounts_and_periods():
+    """Test that NaN, infinite or zero amounts and bad months fail per row."""
+    csv_text = (
+        "biller,amount,due_date,period_month\n"
+        "Meralco,NaN,2026-01-31,\n"
+        "Meralco,-Infinity,2026-01-31,\n"
+        "Meralco,0.00,2026-01-31,\n"
+        "Meralco,10.00,2026-01-31,13\n"
+        "Meralco,10.00,2026-01-31,0\n"
+        "Meralco,10.00,2026-01-31,12\n"
+    )
+    rows = list(iter_csv_bills(io.StringIO(csv_text)))
+
+    assert [isinstance(r, ImportRowError) for r in rows] == [True] * 5 + [False]
+    assert rows[3].line == 5
+    assert rows[5]["period_month"] == 12
+
+
+def test_csv_undecodable_tail_ends_with_a_row_error(sqlite_db):
+    """Test that rows before an encoding error are still imported."""
+    good = "".join(f"Meralco,{i + 1}.00,2026-01-31\n" for i in range(1000))
+    data = ("biller,amount,due_date\n" + good).encode() + b"PLDT,\xff\xfe,2026-02-01\n"
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_by_username_or_email("alice").id
+
+    summary = helpers.import_bills(
+        user_id, iter_csv_bills(text_stream(io.BytesIO(data)))
+    )
+
+    assert summary["imported"] > 0
+    assert summary["invalid"] == 1
+    assert "unreadable" in summary["errors"][0]
+
+
+def test_csv_requires_core_columns():
+    with pytest.raises(ValueError, match="amount"):
+        list(iter_csv_bills(io.StringIO("biller,due_date\nMeralco,2026-01-01\n")))
+
+
+def test_ofx_transactions_become_bills():
+    """Test SGML-style OFX with unclosed and inline tags."""
+    rows = list(iter_ofx_bills(io.StringIO(OFX)))
+
+    assert [(r["biller"], r["amount"], r["due_date"]) for r in rows] == [
+        ("Converge", Decimal("850.00"), date(2026, 1, 5)),
+        ("Maynilad", Decimal("120.50"), date(2026, 2, 10)),
+    ]
+    assert rows[0]["notes"] == "Internet"
+
+
+def test_ofx_credits_are_skipped(sqlite_db):
+    """Test that deposits do not become bills or billers."""
+    ofx = OFX.replace(
+        "</BANKTRANLIST>",
+        "<STMTTRN><TRNTYPE>CREDIT<DTPOSTED>20260115<TRNAMT>45000.00"
+        "<NAME>ACME PAYROLL</STMTTRN>\n"
+        "<STMTTRN><TRNTYPE>CHECK<DTPOSTED>20260120<TRNAMT>300.00"
+        "<NAME>Landlord</STMTTRN>\n</BANKTRANLIST>",
+    )
+    rows = list(iter_ofx_bills(io.StringIO(ofx)))
+    assert [type(r) for r in rows] == [dict, dict, SkippedCredit, dict]
+    assert rows[3]["biller"] == "Landlord"
+
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_id_by_username("alice")
+    summary = helpers.import_bills(user_id, iter_ofx_bills(io.StringIO(ofx)))
+
+    assert (summary["imported"], summary["credits_skipped"]) == (3, 1)
+    assert (summary["invalid"], summary["errors"]) == (0, [])
+    assert "ACME PAYROLL" not in {b.name for b in helpers.list_billers(user_id)}
+
+
+def test_import_bills_deduplicates_and_creates_billers(sqlite_db):
+    """Test chunked import against existing billers and bills."""
+    helpers.register_user("alice", "secret", "Alice", "alice@example.com")
+    user_id = helpers.get_user_id_by_username("alice")
+    meralco = helpers.add_biller(user_id, "Meralco", "Utility")
+    helpers.add_bill(user_id, meralco.id, Decimal("1999.00"), date(2026, 2, 1), 2, 2026)
+
+    rows = iter_csv_bills(io.StringIO(CSV))
+    summary = helpers.import_bills(user_id, rows, chunk_size=2)
+
+    assert summary["imported"] == 2
+    assert summary["duplicates"] == 1
+    assert summary["billers_created"] == 1
+    assert summary["invalid"] == 1
+    assert summary["errors"] == ["Line 5: invalid amount 'not-a-number'"]
+    assert sorted(b.name for b in helpers.list_billers(user_id)) == ["Meralco", "PLDT"]
+    assert len(helpers.list_bills(user_id)) == 3
+
+    # Importing the same file again only finds duplicates
+    again = helpers.import_bills(user_id, iter_csv_bills(io.StringIO(CSV)))
+    assert (again["imported"], again["duplicates"]) == (0, 3)
@@ -0,0 +1,30 @@
+import sys
+from decimal import Decimal
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib.money import format_money, from_cents, to_cents
+
+
+def test_to_cents_rounds_half_up():
+    """Test converting widget floats, strings and Decimals to cents."""
+    assert to_cents(Decimal("1500.25")) == 150025
+    assert to_cents("0.1") == 10
+    assert to_cents(0.1 + 0.2) == 30
+    assert to_cents(2.675) == 268
+    assert to_cents(12) == 1200
+
+
+def test_from_cents_round_trips():
+    """Test that cents convert back to exact two-place Decimals."""
+    assert from_cents(150025) == Decimal("1500.25")
+    assert str(from_cents(5)) == "0.05"
+    assert from_cents(to_cents("999.99")) == Decimal("999.99")
+
+
+def test_format_money():
+    """Test display formatting with thousands separators and sign."""
+    assert format_money(0) == "₱0.00"
+    assert format_money(150050) == "₱1,500.50"
+    assert format_money(-5) == "-₱0.05"
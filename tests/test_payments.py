@@ -1,7 +1,6 @@
 import sys
 from datetime import date
 from decimal import Decimal
-from unittest.mock import MagicMock
 
 import pytest
 from streamlit.testing.v1 import AppTest
@@ -9,73 +8,128 @@ from streamlit.testing.v1 import AppTest
 # Add project root to path
 sys.path.insert(0, ".")
 
-from pages import payments
+from lib.filters import OPEN_STATUS
+from lib.money import to_cents
+from lib.rows import BillRow
+
+USER_ID = 1
+
+
+def run_payments_page(user_id):
+    """AppTest script: from_function only sees this body, so import here."""
+    from pages import payments
+
+    payments.show(user_id)
 
 
 @pytest.fixture
-def mock_payment_helpers(mocker):
+def mock_payment_helpers(mocker, sqlite_db):
     """Mock helper functions used by the payments page."""
-    mock_list_unpaid = mocker.patch("pages.payments.list_unpaid_bills")
+    # sqlite_db keeps section sessions off the real database file
+    mock_search_bills = mocker.patch("pages.payments.search_bills")
     mock_add_payment = mocker.patch("pages.payments.add_payment")
-    mock_list_history = mocker.patch("pages.payments.list_payment_history")
-    return mock_list_unpaid, mock_add_payment, mock_list_history
+    mock_list_history = mocker.patch("pages.payments.list_payment_history_page")
+    mock_list_history.return_value = ([], None)
+    return mock_search_bills, mock_add_payment, mock_list_history
+
 
+def create_unpaid_bill(id, biller_name, amount, balance):
+    """Helper to create an unpaid bill row as returned by search_bills."""
+    return BillRow(
+        id=id,
+        biller_id=1,
+        biller_name=biller_name,
+        amount_cents=to_cents(amount),
+        balance_cents=to_cents(balance),
+        due_date=date(2026, 1, 15),
+        period_month=1,
+        period_year=2026,
+        status="unpaid",
+        notes=None,
+    )
 
-def create_mock_unpaid_bill(id, biller_name, amount, balance):
-    """Helper to create a mock unpaid Bill object."""
-    bill = MagicMock()
-    bill.id = id
-    bill.biller = MagicMock()
-    bill.biller.name = biller_name
-    bill.amount = Decimal(amount)
-    bill.balance_amount = Decimal(balance)
-    bill.status = "unpaid"
-    return bill
+
+def click(at, label):
+    """Click the button with the given label and rerun the app."""
+    return next(b for b in at.button if b.label == label).click().run()
 
 
 def test_payments_no_unpaid_bills(mock_payment_helpers):
     """Test the payments page when there are no unpaid bills."""
-    mock_list_unpaid, _, mock_list_history = mock_payment_helpers
-    mock_list_unpaid.return_value = []
-    mock_list_history.return_value = []
+    mock_search_bills, _, _ = mock_payment_helpers
+    mock_search_bills.return_value = []
 
-    at = AppTest.from_function(payments.show).run()
+    at = AppTest.from_function(run_payments_page, args=(USER_ID,)).run()
 
+    assert not at.exception
     assert at.header[0].value == "Payments"
     assert at.info[0].value == "No unpaid bills to pay."
+    mock_search_bills.assert_called_with(USER_ID, "", status=OPEN_STATUS)
+
+
+def test_payments_bill_search(mock_payment_helpers):
+    """Test that the selector only lists the bills matching the search."""
+    mock_search_bills, _, _ = mock_payment_helpers
+    mock_search_bills.return_value = [
+        create_unpaid_bill(1, "Meralco", "1500.00", "1000.50")
+    ]
+
+    at = AppTest.from_function(run_payments_page, args=(USER_ID,)).run()
+
+    assert at.selectbox(key="payment_bill_choice").options == [
+        "Meralco - Due 2026-01-15 (Total: ₱1,500.00 | Bal: ₱1,000.50) - UNPAID"
+    ]
+
+    mock_search_bills.return_value = []
+    at.text_input(key="payment_bill_search").set_value("Con").run()
+
+    mock_search_bills.assert_called_with(USER_ID, "Con", status=OPEN_STATUS)
+    assert at.info[0].value == "No unpaid bills match your search."
 
 
 def test_payments_form_submission(mock_payment_helpers):
     """Test submitting the payment form for a partial payment."""
-    mock_list_unpaid, mock_add_payment, mock_list_history = mock_payment_helpers
-
-    # Setup mock data
-    mock_bill = create_mock_unpaid_bill(1, "Meralco", "1500.00", "1500.00")
-    mock_list_unpaid.return_value = [mock_bill]
-    mock_list_history.return_value = []
+    mock_search_bills, mock_add_payment, _ = mock_payment_helpers
+    mock_search_bills.return_value = [
+        create_unpaid_bill(1, "Meralco", "1500.00", "1500.00")
+    ]
 
-    at = AppTest.from_function(payments.show).run()
+    at = AppTest.from_function(run_payments_page, args=(USER_ID,)).run()
 
-    # The first selectbox (at.selectbox[0]) is for selecting the bill.
-    # Since there's only one mock bill, we assume it's the default.
-    # We then interact with the rest of the form.
+    # The only matching bill is selected by default
     at.number_input[0].set_value(500.0)
     at.selectbox[1].set_value("GCash")  # Method
     at.selectbox[2].set_value("Partial Payment")  # Status
-    at.text_input[0].set_value("REF123")
-
-    # Submit the form
-    at.form[0].submit().run()
+    at.text_input[1].set_value("REF123")  # text_input[0] searches bills
+    at = click(at, "Save Payment")
 
     # Verify add_payment was called with correct arguments
     mock_add_payment.assert_called_once()
-    call_args, call_kwargs = mock_add_payment.call_args
+    call_args, _ = mock_add_payment.call_args
 
-    assert call_args[0] == 1  # bill_id
-    assert call_args[1] == Decimal("500.0")  # amount
-    assert call_args[2] == date.today()  # paid_on
-    assert call_args[3] == "GCash"  # method
-    assert call_args[4] == "REF123"  # ref
-    assert call_args[6] == "Partial Payment"  # status
+    assert call_args[0] == USER_ID
+    assert call_args[1] == 1  # bill_id
+    assert call_args[2] == Decimal("500.00")  # amount
+    assert call_args[3] == date.today()  # paid_on
+    assert call_args[4] == "GCash"  # method
+    assert call_args[5] == "REF123"  # ref
+    assert call_args[7] == "Partial Payment"  # status
 
     assert at.success[0].value == "Payment recorded successfully"
+
+
+def test_payments_pay_full_amount(mock_payment_helpers):
+    """Test that "Pay Full Amount" pays the exact balance."""
+    mock_search_bills, mock_add_payment, _ = mock_payment_helpers
+    mock_search_bills.return_value = [
+        create_unpaid_bill(1, "Meralco", "1500.00", "1000.55")
+    ]
+
+    at = AppTest.from_function(run_payments_page, args=(USER_ID,)).run()
+    at.checkbox[0].check().run()
+
+    assert at.number_input[0].value == 1000.55
+    assert at.number_input[0].disabled
+    click(at, "Save Payment")
+
+    assert mock_add_payment.call_args[0][2] == Decimal("1000.55")
@@ -0,0 +1,81 @@
+import sys
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib.models import LoginAttempt
+from lib.throttle import LoginAttemptRecorder, LoginThrottle, SlidingWindowLimiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_sliding_window_limiter():
+    """Test that hits expire once they leave the window."""
+    clock = FakeClock()
+    limiter = SlidingWindowLimiter(limit=2, window=10, clock=clock)
+
+    limiter.hit("alice")
+    limiter.hit("alice")
+    assert not limiter.allow("alice")
+    assert limiter.allow("bob")
+
+    clock.now = 10.5
+    assert limiter.allow("alice")
+    limiter.sweep()
+    assert limiter._hits == {}
+
+
+def test_throttle_blocks_by_user_and_client():
+    """Test per-username failure limits and per-client attempt limits."""
+    recorder = LoginAttemptRecorder(batch_size=1000)
+    throttle = LoginThrottle(recorder)
+    throttle.users.limit = 2
+    throttle.clients.limit = 3
+
+    throttle.record("Alice", False, "10.0.0.1")
+    throttle.record("alice", False, "10.0.0.1")
+    assert not throttle.allow("alice", "10.0.0.2")
+
+    throttle.record("bob", True, "10.0.0.1")
+    assert throttle.allow("bob")
+    assert not throttle.allow("bob", "10.0.0.1")
+
+
+def test_attempts_are_flushed_in_batches(sqlite_db):
+    """Test that buffered attempts are persisted by a single batched insert."""
+    recorder = LoginAttemptRecorder(flush_interval=3600, batch_size=3)
+
+    with sqlite_db.track_render("login") as stats:
+        recorder.record("alice", False)
+        recorder.record("alice", False)
+        assert stats.query_count == 0
+        recorder.record("alice", True)
+
+    assert [q.statement.split()[0] for q in stats.queries] == ["INSERT"]
+    with sqlite_db.provide_session() as db:
+        rows = db.query(LoginAttempt).order_by(LoginAttempt.id).all()
+        assert [(r.username, r.success) for r in rows] == [
+            ("alice", False),
+            ("alice", False),
+            ("alice", True),
+        ]
+    assert recorder.flush() == 0
+
+
+def test_flush_leaves_the_rerun_session_alone(sqlite_db):
+    """Test that a full buffer does not commit the rerun's pending work."""
+    recorder = LoginAttemptRecorder(flush_interval=3600, batch_size=1)
+
+    with sqlite_db.unit_of_work() as rerun_session:
+        rerun_session.add(LoginAttempt(username="pending", success=True))
+        recorder.record("alice", False)
+        rerun_session.rollback()
+
+    with sqlite_db.provide_session() as db:
+        assert [r.username for r in db.query(LoginAttempt)] == ["alice"]
@@ -0,0 +1,90 @@
+import sys
+from datetime import date
+
+import pandas as pd
+
+# Add project root to path
+sys.path.insert(0, ".")
+
+from lib.rows import PaymentRow
+from lib.ui import data_frame_from_rows, flash, fragment
+
+
+def test_data_frame_from_rows_typed_columns():
+    """Test that rows are transposed into typed columns."""
+    rows = [
+        PaymentRow(1, 10, "Meralco", 1250, date(2026, 1, 5), None, "GCash", None),
+        PaymentRow(2, 11, None, 10, None, "paid", None, "REF"),
+    ]
+
+    df = data_frame_from_rows(
+        rows,
+        {
+            "ID": "id",
+            "Amount": "amount_cents",
+            "Date": "paid_on",
+            "Biller": "biller_name",
+        },
+        dtypes={"Amount": "int64", "Date": "datetime64[ns]"},
+    )
+
+    assert list(df.columns) == ["ID", "Amount", "Date", "Biller"]
+    assert str(df["ID"].dtype) == "int64"
+    assert str(df["Amount"].dtype) == "int64"
+    assert str(df["Date"].dtype) == "datetime64[ns]"
+    assert df["Amount"].tolist() == [1250, 10]
+    assert df["Date"].iloc[0] == pd.Timestamp(2026, 1, 5)
+    assert df["Date"].isna().iloc[1]
+    assert df["Biller"].iloc[0] == "Meralco"
+    assert df["Biller"].isna().iloc[1]
+
+
+def test_data_frame_from_rows_empty_keeps_dtypes():
+    """Test that an empty page still yields the declared columns."""
+    df = data_frame_from_rows(
+        [],
+        {"Amount": "amount_cents", "Date": "paid_on"},
+        dtypes={"Date": "datetime64[ns]"},
+    )
+
+    assert df.empty
+    assert list(df.columns) == ["Amount", "Date"]
+    assert str(df["Date"].dtype) == "datetime64[ns]"
+
+
+def test_flash_survives_one_rerun(mocker):
+    """Test that a flashed message is shown once, on the next run."""
+    mock_st = mocker.patch("lib.ui.st")
+    mock_st.session_state = {}
+
+    flash("bills", "Bill added successfully!")
+    mock_st.success.assert_not_called()
+
+    flash("bills")
+    mock_st.success.assert_called_once_with("Bill added successfully!")
+
+    flash("bills")
+    assert mock_st.success.call_count == 1
+
+
+def test_fragment_rerun_gets_a_session_and_error_handling(mocker, sqlite_db):
+    """Test that a partial rerun shares one session and reports errors."""
+    mock_st = mocker.patch("lib.ui.st")
+    mock_st.fragment.side_effect = lambda func: func
+    sessions = []
+
+    @fragment("test.section")
+    def section(fail=False):
+        for _ in range(2):
+            with sqlite_db.provide_session() as db:
+                sessions.append(db)
+        if fail:
+            raise ValueError("boom")
+        return "rendered"
+
+    assert section() == "rendered"
+    assert sessions[0] is sessions[1]
+    mock_st.error.assert_not_called()
+
+    assert section(fail=True) is None
+    mock_st.error.assert_called_once()